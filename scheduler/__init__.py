@@ -0,0 +1,57 @@
+"""Timetable scheduling engine used by the Streamlit app.
+
+Importing this package never pulls in Streamlit or pandas::
+
+    from scheduler import Problem, solve
+
+    solution = solve(Problem())
+    if solution.complete:
+        save_schedules(solution.schedules, "schedules.ttb")
+"""
+
+from scheduler.background import Generation
+from scheduler.batch import solve_batch, validate_batch
+from scheduler.columnar import ScheduleFile, append_snapshot, load_snapshot, save_snapshots
+from scheduler.engines import available_engines, get_engine
+from scheduler.exact import solve_exact
+from scheduler.loader import load_catalog, validate_catalog
+from scheduler.optimize import optimize
+from scheduler.portfolio import solve_portfolio
+from scheduler.problem import Problem, Solution, is_slot_available
+from scheduler.repair import repair
+from scheduler.session import Session
+from scheduler.solver import CSPSolver, solve
+from scheduler.state import Occupancy
+from scheduler.storage import load_schedules, save_schedules
+from scheduler.store import ScheduleStore
+from scheduler.validator import ScheduleChecker, validate
+
+__all__ = [
+    "CSPSolver",
+    "Generation",
+    "Occupancy",
+    "Problem",
+    "ScheduleFile",
+    "ScheduleStore",
+    "ScheduleChecker",
+    "Session",
+    "Solution",
+    "append_snapshot",
+    "available_engines",
+    "get_engine",
+    "is_slot_available",
+    "load_catalog",
+    "load_schedules",
+    "load_snapshot",
+    "optimize",
+    "repair",
+    "save_schedules",
+    "save_snapshots",
+    "solve",
+    "solve_batch",
+    "solve_exact",
+    "solve_portfolio",
+    "validate",
+    "validate_batch",
+    "validate_catalog",
+]
@@ -0,0 +1,61 @@
+"""Analysis index shared by the app's tabs.
+
+``AnalysisIndex`` walks a timetable once and keeps everything the Schedules
+and Course Analysis tabs need. The app builds it once per schedule version
+(``schedule_hash``) instead of letting every tab rescan the nested schedules
+dict on each rerun. The Teacher Workload and Daily Load figures come from
+the array view in ``scheduler.grid``.
+"""
+
+import hashlib
+import json
+
+from scheduler.session import cell_session
+from scheduler.storage import schedules_to_json
+
+
+def schedule_hash(schedules):
+    """Content hash of a timetable, stable across runs and processes."""
+    data = json.dumps(schedules_to_json(schedules), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class AnalysisIndex:
+    """Per-group and per-component summaries of one timetable."""
+
+    def __init__(self, problem, schedules, version=None):
+        self.problem = problem
+        self.version = version or schedule_hash(schedules)
+
+        self.group_sessions = {}     # group -> number of sessions
+        # group -> day -> courses lectured that day, in slot order
+        self.group_daily_lectures = {group: {day: [] for day in problem.days} for group in problem.groups}
+        # course -> component -> {"shared": n, "individual": {group: n}}
+        self.component_counts = {
+            course: {
+                component: {"shared": 0, "individual": {group: 0 for group in problem.groups}}
+                for component in components
+            }
+            for course, components in problem.courses.items()
+        }
+
+        slot_labels = problem.slot_labels
+        for group, schedule in schedules.items():
+            daily_lectures = self.group_daily_lectures.setdefault(group, {day: [] for day in problem.days})
+            for day in problem.days:
+                cells = schedule.get(day, {})
+                for slot_label in slot_labels:
+                    session = cell_session(cells.get(slot_label))
+                    if session is None:
+                        continue
+                    self.group_sessions[group] = self.group_sessions.get(group, 0) + 1
+
+                    if session.is_lecture and session.course not in daily_lectures[day]:
+                        daily_lectures[day].append(session.course)
+
+                    counters = self.component_counts.get(session.course, {}).get(session.component)
+                    if counters is not None:
+                        if session.shared:
+                            counters["shared"] += 1
+                        else:
+                            counters["individual"][group] = counters["individual"].get(group, 0) + 1
@@ -0,0 +1,86 @@
+"""Solver runs on a background thread that stream their progress.
+
+``Generation`` starts an engine on a worker thread and passes what the
+engine reports (``Progress``: sessions placed, best so far, nodes,
+backtracks) through a queue. A caller that must stay responsive, like the
+Streamlit app, which reruns its script on every click, polls it instead of
+blocking on the solve::
+
+    run = Generation(problem, engine="csp")
+    while not run.done:
+        for event in run.events():
+            print(f"{event.best}/{event.total} sessions placed")
+        time.sleep(0.5)
+    solution = run.result()
+
+``stop`` asks the engine to return at its next check with the best
+timetable found so far. The run is a thread rather than a process so that
+what the CSP search learns stays in this process for the next run (see
+``scheduler.nogoods``).
+"""
+
+import queue
+import threading
+import time
+
+from scheduler.engines import DEFAULT_ENGINE, get_engine
+
+
+class Generation:
+    """One engine run on a daemon thread, with its progress events and result."""
+
+    def __init__(self, problem, engine=DEFAULT_ENGINE, **kwargs):
+        solve = get_engine(engine)
+        self.engine = engine
+        self.started = time.perf_counter()
+        self.latest = None  # last Progress handed out by events()
+        self.solution = None
+        self.error = None
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(solve, problem, kwargs),
+                                        name=f"generation-{engine}", daemon=True)
+        self._thread.start()
+
+    def _run(self, solve, problem, kwargs):
+        try:
+            self.solution = solve(problem, stop=self._stop, progress=self._events.put, **kwargs)
+        except Exception as error:
+            self.error = error
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def stop(self):
+        """Ask the engine to finish with the best timetable found so far."""
+        self._stop.set()
+
+    def events(self):
+        """Progress reported since the last call, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            self.latest = events[-1]
+        return events
+
+    def result(self, timeout=None):
+        """Wait for the run and return its ``Solution``; raises what the engine raised."""
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError(f"The {self.engine} engine is still running")
+        if self.error is not None:
+            raise self.error
+        return self.solution
@@ -0,0 +1,227 @@
+"""Joint timetables for several cohorts that share teachers.
+
+A cohort is one catalog (a ``Problem``), e.g. the 1CS S2 groups. Cohorts of
+one department share teachers, so solving them one by one is not enough: a
+teacher cannot be in two places at once, and the 2-day cap counts the days
+taught to every cohort together.
+
+``merge_problems`` turns several cohorts into one ``Problem`` whose groups
+and courses carry the cohort name ("1CS / Group 1", "1CS / rx2"). Each
+course is only taken by the groups of its cohort (``course_groups``) and
+keeps the backup teachers of its cohort, so every engine solves the cohorts
+jointly as it is, and ``split_schedules`` cuts the result back into
+per-cohort timetables with the original names.
+
+``solve_batch`` first splits the cohorts into independent components:
+two cohorts are linked when a teacher (primary or backup) could teach in
+both, or when they use the same rooms. Each component is solved jointly,
+the components in parallel on a process pool::
+
+    solutions = solve_batch({"1CS": load_catalog("1cs.json"), "2CS": load_catalog("2cs.json")})
+    for cohort, solution in solutions.items():
+        save_schedules(solution.schedules, f"schedules-{cohort}.ttb")
+"""
+
+import copy
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler.engines import DEFAULT_ENGINE, get_engine
+from scheduler.problem import Problem
+from scheduler.session import Session
+from scheduler.solver import DEFAULT_MAX_NODES, CSPSolver, build_variables
+from scheduler.validator import validate
+
+SEPARATOR = " / "
+
+
+def _prefixed(cohort, name):
+    return f"{cohort}{SEPARATOR}{name}"
+
+
+def _check_cohorts(cohorts):
+    if not cohorts:
+        raise ValueError("A batch needs at least one cohort")
+    first = next(iter(cohorts.values()))
+    has_rooms = bool(first.rooms)
+    for name, problem in cohorts.items():
+        if not name or SEPARATOR in name:
+            raise ValueError(f"Invalid cohort name {name!r} (must be non-empty, without {SEPARATOR.strip()!r})")
+        if problem.days != first.days or problem.time_slots != first.time_slots:
+            raise ValueError(f"Cohort {name} has another week (days and time slots must match)")
+        if bool(problem.rooms) != has_rooms:
+            raise ValueError("Either every cohort lists its rooms or none does")
+
+
+def merge_problems(cohorts):
+    """One ``Problem`` holding every cohort of ``cohorts`` ({name: Problem}).
+
+    All cohorts must have the same days and time slots. Teachers are
+    matched by name across cohorts, and so are rooms (a room listed twice
+    must be the same room).
+    """
+    _check_cohorts(cohorts)
+    first = next(iter(cohorts.values()))
+    merged = Problem(
+        groups=[], days=list(first.days), time_slots=copy.deepcopy(first.time_slots), courses={},
+        additional_teachers={}, backup_teachers={}, component_backup_teachers={}, rooms=[],
+    )
+    rooms = {}
+    for name, problem in cohorts.items():
+        merged.groups.extend(_prefixed(name, group) for group in problem.groups)
+        for group, size in problem.group_sizes.items():
+            merged.group_sizes[_prefixed(name, group)] = size
+        for course, components in problem.courses.items():
+            course_name = _prefixed(name, course)
+            merged.courses[course_name] = copy.deepcopy(components)
+            merged.course_groups[course_name] = [_prefixed(name, group) for group in problem.groups_of(course)]
+            if course in problem.additional_teachers:
+                merged.additional_teachers[course_name] = copy.deepcopy(problem.additional_teachers[course])
+            # The cohort's component backups become per-component backups of
+            # its own courses, after the course's
+            course_backups = problem.backup_teachers.get(course, [])
+            merged.backup_teachers[course_name] = {
+                component: list(course_backups.get(component, []) if isinstance(course_backups, dict)
+                                else course_backups) + list(problem.component_backup_teachers.get(component, []))
+                for component in components
+            }
+        for teacher, days in problem.teacher_unavailable.items():
+            for day, labels in days.items():
+                merged.block_teacher(teacher, day, labels)
+        for room in problem.rooms:
+            known = rooms.setdefault(room.get("name"), room)
+            if known != room:
+                raise ValueError(f"Room {room.get('name')} is described differently by cohort {name}")
+    merged.rooms = copy.deepcopy(list(rooms.values()))
+    return merged
+
+
+def _rename(cell, cohort):
+    """A cell of the merged timetable with the cohort prefix taken off."""
+    if not isinstance(cell, Session):
+        return cell
+    prefix = _prefixed(cohort, "")
+    return cell._replace(
+        course=cell.course[len(prefix):] if cell.course.startswith(prefix) else cell.course,
+        group=cell.group[len(prefix):] if cell.group and cell.group.startswith(prefix) else cell.group,
+    )
+
+
+def split_schedules(cohorts, schedules):
+    """Cut a merged timetable into {cohort: schedules} with the cohorts' own names."""
+    result = {}
+    for name, problem in cohorts.items():
+        result[name] = {}
+        for group in problem.groups:
+            merged = schedules.get(_prefixed(name, group), {})
+            result[name][group] = {
+                day: {label: _rename(cell, name) for label, cell in cells.items()}
+                for day, cells in merged.items()
+            }
+    return result
+
+
+def merge_schedules(cohorts, schedules):
+    """The merged timetable of {cohort: schedules}, the inverse of ``split_schedules``."""
+    merged = {}
+    for name, by_group in schedules.items():
+        courses = set(cohorts[name].courses)
+        for group, days in by_group.items():
+            merged[_prefixed(name, group)] = {
+                day: {
+                    label: cell._replace(
+                        course=_prefixed(name, cell.course) if cell.course in courses else cell.course,
+                        group=_prefixed(name, cell.group) if cell.group is not None else None,
+                    ) if isinstance(cell, Session) else cell
+                    for label, cell in cells.items()
+                }
+                for day, cells in days.items()
+            }
+    return merged
+
+
+def validate_batch(cohorts, schedules):
+    """Issues of {cohort: schedules} taken together, teacher and room rules across cohorts included."""
+    return validate(merge_problems(cohorts), merge_schedules(cohorts, schedules))
+
+
+def _resources(problem):
+    """Every teacher who may teach in ``problem``, and its room names."""
+    variables = build_variables(
+        problem.groups, problem.courses, problem.additional_teachers, problem.component_backup_teachers,
+        problem.backup_teachers, problem.course_groups,
+    )
+    teachers = {t for var in variables for t in [var.teacher] + var.backups}
+    return teachers | {("room", room.get("name")) for room in problem.rooms}
+
+
+def coupled_cohorts(cohorts):
+    """Cohort names grouped into components that share a teacher or a room, in input order."""
+    names = list(cohorts)
+    parent = {name: name for name in names}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    owner = {}
+    for name in names:
+        for resource in _resources(cohorts[name]):
+            other = owner.setdefault(resource, name)
+            parent[root(name)] = root(other)
+    components = {}
+    for name in names:
+        components.setdefault(root(name), []).append(name)
+    return list(components.values())
+
+
+def _unscheduled(problem, schedules):
+    """Sessions of ``problem`` that ``schedules`` leaves out, named as in ``problem``."""
+    solver = CSPSolver(problem)
+    return solver.unscheduled(solver.assignment_from_schedules(schedules))
+
+
+def _solve_component(problem, engine, kwargs):
+    return get_engine(engine)(problem, **kwargs)
+
+
+def solve_batch(cohorts, engine=DEFAULT_ENGINE, workers=None, seed=None, max_nodes=DEFAULT_MAX_NODES,
+                time_limit=None):
+    """Solve ``cohorts`` ({name: Problem}) jointly; returns {name: Solution}.
+
+    Cohorts that share no teacher or room are solved independently, on up
+    to ``workers`` processes. Every cohort's ``Solution`` comes from the
+    joint solve of its component: it is complete when that joint timetable
+    is, and its counters and trace are the component's.
+    """
+    _check_cohorts(cohorts)
+    get_engine(engine)
+    components = coupled_cohorts(cohorts)
+    problems = [merge_problems({name: cohorts[name] for name in component}) for component in components]
+    kwargs = {"seed": seed, "max_nodes": max_nodes}
+    if time_limit is not None:
+        kwargs["time_limit"] = time_limit
+
+    workers = min(workers or os.cpu_count() or 1, len(problems))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            solutions = list(executor.map(_solve_component, problems, [engine] * len(problems),
+                                          [kwargs] * len(problems)))
+    else:
+        solutions = [_solve_component(problem, engine, kwargs) for problem in problems]
+
+    results = {}
+    for component, solution in zip(components, solutions):
+        split = split_schedules({name: cohorts[name] for name in component}, solution.schedules)
+        for name in component:
+            # Read back against the cohort's own sessions rather than parsing
+            # the merged problem's descriptions
+            results[name] = dataclasses.replace(
+                solution,
+                schedules=split[name],
+                unscheduled=[] if solution.complete else _unscheduled(cohorts[name], split[name]),
+            )
+    return {name: results[name] for name in cohorts}
@@ -0,0 +1,217 @@
+"""Benchmark harness: ``python -m scheduler.bench``.
+
+Generates synthetic catalogs shaped like the built-in one (shared lectures,
+TD/TP components with one or several teachers, component backup teachers)
+and solves them across a grid of sizes. For every run it records wall time,
+peak memory, whether the timetable is complete and the constraint violation
+counts, and writes the results as JSON so they can be compared across
+releases::
+
+    python -m scheduler.bench --groups 5,10,20 --courses 8 --repeats 3 -o bench.json
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler.problem import Problem
+from scheduler.solver import DEFAULT_MAX_NODES, solve
+from scheduler.validator import ScheduleChecker
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+BENCH_FORMAT_VERSION = 1
+WEEK = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def synthetic_problem(n_groups, n_courses, n_teachers, n_days=5, n_slots=5, seed=0):
+    """A random catalog with the same shape as ``scheduler.catalog``.
+
+    Components get one parallel teacher per four groups, taken from the least
+    loaded teachers of the pool, so the teacher count is what decides how
+    tight the 2-day limit gets.
+    """
+    rng = random.Random(seed)
+    teachers = [f"Teacher {i + 1}" for i in range(n_teachers)]
+    load = {teacher: 0 for teacher in teachers}
+    per_component = -(-n_groups // 4)
+
+    def pick(count, sessions):
+        ranked = sorted(teachers, key=lambda teacher: (load[teacher], rng.random()))
+        picked = ranked[:count]
+        for teacher in picked:
+            load[teacher] += sessions
+        return picked
+
+    courses = {}
+    for c in range(n_courses):
+        # Every course has a shared lecture, most have a TD and about one in four a TP
+        components = {"cours": {"teacher": pick(1, 1)[0], "shared": True}}
+        for component, chance in (("td", 0.9), ("tp", 0.25)):
+            if rng.random() < chance:
+                picked = pick(min(per_component, n_teachers), -(-n_groups // per_component))
+                if len(picked) == 1:
+                    components[component] = {"teacher": picked[0], "shared": False}
+                else:
+                    components[component] = [{"teacher": teacher, "shared": False} for teacher in picked]
+        courses[f"course{c + 1}"] = components
+
+    backups = max(1, n_teachers // 4)
+    return Problem(
+        groups=[f"Group {g + 1}" for g in range(n_groups)],
+        days=[WEEK[d] if d < len(WEEK) else f"Day {d + 1}" for d in range(n_days)],
+        time_slots=[{"label": f"Slot {s + 1}", "unavailable": []} for s in range(n_slots)],
+        courses=courses,
+        additional_teachers={},
+        backup_teachers={},
+        component_backup_teachers={
+            "td": rng.sample(teachers, min(backups, n_teachers)),
+            "tp": rng.sample(teachers, min(backups, n_teachers)),
+        },
+    )
+
+
+def run_case(case):
+    """Solve one benchmark case; meant to run in a fresh worker process."""
+    problem = synthetic_problem(
+        case["groups"], case["courses"], case["teachers"], case["days"], case["slots"], case["catalog_seed"]
+    )
+    started = time.perf_counter()
+    # Runs must not learn from each other, or repeats would get faster
+    solution = solve(problem, seed=case["seed"], max_nodes=case["max_nodes"], time_limit=case["time_limit"],
+                     learn=False)
+    wall_time = time.perf_counter() - started
+
+    checker = ScheduleChecker.from_schedules(problem, solution.schedules)
+    result = dict(case)
+    result.update({
+        "wall_time": round(wall_time, 6),
+        "peak_memory_kb": _peak_memory_kb(),
+        "complete": solution.complete,
+        "unscheduled": len(solution.unscheduled),
+        "nodes": solution.nodes,
+        "backtracks": solution.backtracks,
+        "violations": checker.total,
+        "violation_counts": dict(checker.counts),
+    })
+    return result
+
+
+def _peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def benchmark_cases(groups, courses, teachers, days, slots, repeats=1, seed=None,
+                    time_limit=30.0, max_nodes=DEFAULT_MAX_NODES):
+    """Expand the size grid into one case per (size, repeat)."""
+    cases = []
+    for n_groups, n_courses, n_teachers, n_days, n_slots in itertools.product(groups, courses, teachers, days, slots):
+        for repeat in range(repeats):
+            cases.append({
+                "groups": n_groups,
+                "courses": n_courses,
+                "teachers": n_teachers,
+                "days": n_days,
+                "slots": n_slots,
+                "catalog_seed": repeat,
+                "seed": seed,
+                "time_limit": time_limit,
+                "max_nodes": max_nodes,
+            })
+    return cases
+
+
+def run_benchmark(cases):
+    """Run every case in its own process so peak memory is per run."""
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(run_case, case).result())
+    return results
+
+
+def summarize(results):
+    """Success rate and mean time per size."""
+    sizes = {}
+    for result in results:
+        key = (result["groups"], result["courses"], result["teachers"], result["days"], result["slots"])
+        sizes.setdefault(key, []).append(result)
+    summary = []
+    for (n_groups, n_courses, n_teachers, n_days, n_slots), runs in sizes.items():
+        summary.append({
+            "groups": n_groups,
+            "courses": n_courses,
+            "teachers": n_teachers,
+            "days": n_days,
+            "slots": n_slots,
+            "runs": len(runs),
+            "success_rate": sum(run["complete"] for run in runs) / len(runs),
+            "mean_wall_time": sum(run["wall_time"] for run in runs) / len(runs),
+            "max_peak_memory_kb": max((run["peak_memory_kb"] or 0) for run in runs),
+            "mean_violations": sum(run["violations"] for run in runs) / len(runs),
+        })
+    return summary
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scheduler.bench", description="Benchmark the scheduler.")
+    parser.add_argument("--groups", type=_int_list, default=[5, 10, 20], help="comma separated group counts")
+    parser.add_argument("--courses", type=_int_list, default=[8], help="comma separated course counts")
+    parser.add_argument("--teachers", type=_int_list, default=[24], help="comma separated teacher pool sizes")
+    parser.add_argument("--days", type=_int_list, default=[5], help="comma separated day counts")
+    parser.add_argument("--slots", type=_int_list, default=[5], help="comma separated slots per day")
+    parser.add_argument("--repeats", type=int, default=3, help="catalogs generated per size")
+    parser.add_argument("--seed", type=int, help="solver seed (default: deterministic ordering)")
+    parser.add_argument("--time-limit", type=float, default=30.0, help="seconds per run")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, help="search node limit per run")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cases = benchmark_cases(args.groups, args.courses, args.teachers, args.days, args.slots,
+                            repeats=args.repeats, seed=args.seed, time_limit=args.time_limit,
+                            max_nodes=args.max_nodes)
+    results = run_benchmark(cases)
+    report = {
+        "format": BENCH_FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "summary": summarize(results),
+    }
+
+    for row in report["summary"]:
+        print(f"groups={row['groups']:>4} courses={row['courses']:>3} teachers={row['teachers']:>4} "
+              f"days={row['days']} slots={row['slots']}  success={row['success_rate']:.0%}  "
+              f"time={row['mean_wall_time']:.3f}s  peak={row['max_peak_memory_kb']}KB  "
+              f"violations={row['mean_violations']:.1f}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
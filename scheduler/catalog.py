@@ -0,0 +1,116 @@
+"""Built-in course catalog for the 1CS S2 groups.
+
+These are the defaults used by the app and the command line when no catalog
+file is given.
+"""
+
+DEFAULT_GROUPS = ["Group 1", "Group 2", "Group 3", "Group 4", "Group 5"]
+
+# Constants for days and time slots
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+TIME_SLOTS = [
+    {"label": "08:00-09:30", "unavailable": []},
+    {"label": "09:40-11:10", "unavailable": []},
+    {"label": "11:20-12:50", "unavailable": []},
+    {"label": "13:00-14:30", "unavailable": []},
+    {"label": "14:40-16:10", "unavailable": []}
+]
+
+# Courses and their components
+COURSES = {
+    "rx2": {
+        "cours": {"teacher": "Dr. Zenadji", "shared": True},
+        "td": {"teacher": "Mr. Sahli", "shared": False},
+        "tp": [  # Using a list for multiple teachers
+            {"teacher": "Dr. Zenadji", "shared": False},
+            {"teacher": "Mr. Benali", "shared": False}
+        ]
+    },
+    "ro2": {
+        "cours": {"teacher": "Dr. Issaadi", "shared": True},
+        "td": [
+            {"teacher": "Dr. Issaadi", "shared": False},
+            {"teacher": "Dr. Ighdabi", "shared": False}
+        ]
+    },
+    "adhd": {
+        "cours": {"teacher": "Prof. Djenadi", "shared": True},
+        "td": [
+            {"teacher": "Prof. Djenadi", "shared": False},
+            {"teacher": "Dr. two", "shared": False}
+        ]
+    },
+    "AI": {
+        "cours": {"teacher": "Dr. Lekehali", "shared": True},
+        "td": {"teacher": "Dr. Lekehali", "shared": False},
+        "tp": [
+            {"teacher": "el chabiba", "shared": False},
+            {"teacher": "Mr. Ferhat", "shared": False},
+            {"teacher": "Mr. Benali", "shared": False}
+        ]
+    },
+    "Entrepreneuriat": {
+        "cours": {"teacher": "mme. Kaci", "shared": True}
+    },
+    "mf": {
+        "cours": {"teacher": "Dr. el Zedk", "shared": True},
+        "td": {"teacher": "Dr. el Zedk", "shared": False}
+    },
+    "security": {
+        "cours": {"teacher": "Dr. Brahimi", "shared": True},
+        "td": {"teacher": "Dr. Brahimi", "shared": False}
+    },
+    "an": {
+        "cours": {"teacher": "Dr. Alkama", "shared": True},
+        "td": {"teacher": "Dr. Alkama", "shared": False}
+    }
+}
+
+# Additional teachers for different components of each course
+ADDITIONAL_TEACHERS = {
+    "Math": {
+        "td": ["Dr. Smith", "Ms. Thompson", "Mr. Roberts"],
+        "tp": ["Mr. Johnson", "Ms. Lee", "Dr. Hall"]
+    },
+    "Physics": {
+        "td": ["Dr. Brown", "Dr. Green", "Ms. Walker"],
+        "tp": ["Ms. Davis", "Mr. Wright", "Dr. Rodriguez"]
+    },
+    "Chemistry": {
+        "td": ["Dr. Wilson", "Dr. Martin", "Mr. King"],
+        "tp": ["Mrs. Taylor", "Dr. Lopez", "Ms. Young"]
+    },
+    "Programming": {
+        "td": ["Prof. Clark", "Dr. Hughes", "Mrs. Baker"],
+        "tp": ["Mr. Anderson", "Ms. Cook", "Prof. Sanders"]
+    },
+    "Algorithms": {
+        "td": ["Dr. White", "Dr. Morris", "Prof. Bell"],
+        "tp": ["Ms. Martinez", "Mr. Cooper", "Dr. Achrafness"]
+    }
+}
+
+# Backup teachers that can be used if no other teachers are available
+BACKUP_TEACHERS = {
+    "Math": ["Dr. Parker", "Prof. Edwards", "Dr. Gonzalez", "Ms. Perez", "Dr. Collins", "Dr. Alkama", "Dr. Zenadji", "Prof. Khan", "Dr. Silverman", "Dr. Gupta"],
+    "Physics": ["Dr. Morgan", "Prof. Peterson", "Dr. James", "Ms. Watson", "Dr. Garcia", "Dr. Issaadi", "Prof. Djenadi", "Dr. Rodriguez", "Prof. Takahashi", "Dr. Chen"],
+    "Chemistry": ["Dr. Henderson", "Prof. Torres", "Dr. Murphy", "Ms. Nelson", "Dr. Rivera", "Dr. Lekehali", "Dr. Brahimi", "Prof. Ramirez", "Dr. Patel", "Dr. Kim"],
+    "Programming": ["Dr. Bennett", "Prof. Carter", "Dr. Price", "Mr. Adams", "Dr. Powell", "Dr. el Zedk", "Mme. Kaci", "Prof. Nguyen", "Dr. Singh", "Dr. Malhotra"],
+    "Algorithms": ["Dr. Mitchell", "Prof. Turner", "Dr. Evans", "Ms. Jenkins", "Dr. Foster", "Mr. Sahli", "Dr. el chabiba", "Prof. Sharma", "Dr. Nakamura", "Dr. Petrov"]
+}
+
+# Additional backup teachers for specific components
+COMPONENT_BACKUP_TEACHERS = {
+    "td": ["Dr. Alkama", "Mr. Sahli", "Dr. Issaadi", "Prof. Djenadi", "Dr. Lekehali", "Dr. el Zedk", "Dr. Brahimi", "Prof. Khan", "Dr. Singh", "Prof. Ramirez"],
+    "tp": ["Dr. Zenadji", "el chabiba", "Ms. Jenkins", "Dr. Foster", "Ms. Martinez", "Mr. Anderson", "Ms. Lee", "Dr. Chen", "Dr. Kim", "Dr. Malhotra"]
+}
+
+# Rooms: {"name", "capacity", "type"}. With no rooms listed, sessions are
+# placed without a room; a room without a type or capacity fits any session.
+ROOMS = []
+
+# Room type each component needs, unless its catalog entry gives "room_type"
+ROOM_TYPES = {"cours": "amphi", "td": "td", "tp": "lab"}
+
+# Students per group, unless Problem.group_sizes says otherwise
+DEFAULT_GROUP_SIZE = 30
@@ -0,0 +1,175 @@
+"""Command line entry point: ``python -m scheduler``.
+
+Reads a course catalog (JSON, YAML or CSV, see ``scheduler.loader``;
+anything missing comes from the built-in catalog), solves it and writes
+schedules.ttb (JSON for an output path ending in .json), which the app
+loads. With ``--repair`` an existing schedules file is patched for the
+catalog instead, moving as few sessions as possible. With ``--batch`` several
+catalogs (one per cohort) are solved jointly, so teachers they share keep
+every rule across them, and each cohort gets its own schedules file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from scheduler.batch import solve_batch
+from scheduler.engines import DEFAULT_ENGINE, ENGINES, get_engine
+from scheduler.loader import load_catalog
+from scheduler.optimize import optimize
+from scheduler.portfolio import solve_portfolio
+from scheduler.problem import Problem
+from scheduler.repair import repair
+from scheduler.solver import DEFAULT_MAX_NODES, DEFAULT_TIME_LIMIT
+from scheduler.storage import DEFAULT_PATH, load_schedules, save_schedules
+from scheduler.store import ScheduleStore
+from scheduler.trace import PROFILERS
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scheduler", description="Generate group timetables.")
+    parser.add_argument("-c", "--catalog", help="course catalog JSON, YAML or CSV file (default: built-in catalog)")
+    parser.add_argument("--batch", nargs="+", metavar="CATALOG",
+                        help="solve these cohort catalogs jointly; cohort COHORT (the file name) is written to "
+                             "OUTPUT with -COHORT before its extension")
+    parser.add_argument("-o", "--output", default=DEFAULT_PATH, help=f"where to write the schedules (default: {DEFAULT_PATH})")
+    parser.add_argument("-g", "--groups", type=int, help="generate N groups named 'Group 1'..'Group N'")
+    parser.add_argument("-e", "--engine", choices=list(ENGINES), default=DEFAULT_ENGINE,
+                        help=f"solver engine (default: {DEFAULT_ENGINE}); cpsat and pulp prove infeasibility")
+    parser.add_argument("--seed", type=int, help="randomize value ordering ties with this seed")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, help="search node limit")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT,
+                        help=f"stop searching after this many seconds (default: {DEFAULT_TIME_LIMIT:g})")
+    parser.add_argument("--repair", metavar="SCHEDULES",
+                        help="repair this schedules file for the catalog instead of solving from scratch")
+    parser.add_argument("--optimize", type=float, metavar="SECONDS",
+                        help="then improve gaps, day balance and backup usage by local search for SECONDS")
+    parser.add_argument("-p", "--portfolio", type=int, metavar="N",
+                        help="launch N seeded runs in parallel and keep the first complete one")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="worker processes for --portfolio and --batch (default: CPU count)")
+    parser.add_argument("--nogoods", metavar="DIR",
+                        help="start from the nogoods learned on this catalog in DIR and save the new ones there")
+    parser.add_argument("--store", metavar="DB", help="also record the run in this schedule history database")
+    parser.add_argument("--trace", metavar="JSON", help="write the run's counters, phase timings and profile here")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile the solve and add the result to the trace")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.portfolio and args.engine != DEFAULT_ENGINE:
+        parser.error("--portfolio only runs the csp engine")
+    if args.nogoods and (args.portfolio or args.repair or args.engine != DEFAULT_ENGINE):
+        parser.error("--nogoods only applies to a single csp solve")
+    if args.portfolio and args.profile:
+        parser.error("--profile cannot follow the --portfolio worker processes")
+    if args.batch:
+        for option in ("catalog", "repair", "portfolio", "groups", "optimize", "store", "nogoods", "profile"):
+            if getattr(args, option):
+                parser.error(f"--{option} does not apply to --batch")
+        return run_batch(parser, args)
+    previous = None
+    if args.repair:
+        previous = load_schedules(args.repair)
+        if previous is None:
+            parser.error(f"No schedules file at {args.repair}")
+
+    try:
+        problem = load_catalog(args.catalog) if args.catalog else Problem()
+    except (OSError, ValueError, ImportError) as exc:
+        parser.error(str(exc))
+    if args.groups:
+        problem.groups = [f"Group {i + 1}" for i in range(args.groups)]
+
+    if previous is not None:
+        solution = repair(problem, previous, seed=args.seed, max_nodes=args.max_nodes, time_limit=args.time_limit,
+                          profile=args.profile)
+    elif args.portfolio:
+        solution = solve_portfolio(problem, runs=args.portfolio, workers=args.workers, seed=args.seed,
+                                   time_limit=args.time_limit, max_nodes=args.max_nodes)
+    else:
+        engine = get_engine(args.engine)
+        kwargs = {"time_limit": args.time_limit}
+        if args.nogoods:
+            kwargs["cache_dir"] = args.nogoods
+        try:
+            solution = engine(problem, seed=args.seed, max_nodes=args.max_nodes, profile=args.profile, **kwargs)
+        except ImportError as exc:
+            parser.error(str(exc))
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as f:
+            json.dump(solution.trace, f, indent=2)
+    # The construction's own statistics are reported apart from the optimizer's
+    constructed = solution
+    if args.optimize and solution.complete:
+        solution = optimize(problem, solution.schedules, seed=args.seed, time_limit=args.optimize)
+    save_schedules(solution.schedules, args.output)
+    if args.store:
+        with ScheduleStore(args.store) as store:
+            store.add(problem, solution, engine=args.engine, max_nodes=args.max_nodes, time_limit=args.time_limit,
+                      portfolio=args.portfolio, optimize=args.optimize, repair=bool(args.repair))
+
+    for item in solution.unscheduled:
+        print(f"Could not schedule {item}", file=sys.stderr)
+    if not args.quiet:
+        status = "complete" if solution.complete else "infeasible" if solution.infeasible else "incomplete"
+        print(f"Wrote {status} schedules for {len(problem.groups)} groups to {args.output} "
+              f"(seed {constructed.seed}, {constructed.nodes} nodes, {constructed.backtracks} backtracks, "
+              f"{constructed.elapsed:.2f}s)")
+        if constructed.limit is not None:
+            print(f"Search stopped by {describe_limit(constructed.limit, args)}")
+        if solution is not constructed:
+            print(f"Optimizer tried {solution.nodes} moves, accepted {solution.nodes - solution.backtracks} "
+                  f"({solution.elapsed:.2f}s)")
+        if previous is not None:
+            print(f"Repair moved {solution.moved} sessions")
+    return 0 if solution.complete else 1
+
+
+def describe_limit(limit, args):
+    if limit == "nodes":
+        return f"the node limit ({args.max_nodes} nodes, see --max-nodes)"
+    if limit == "time":
+        return f"the time limit ({args.time_limit:g}s, see --time-limit)"
+    return "a stop request"
+
+
+def run_batch(parser, args):
+    cohorts = {}
+    for path in args.batch:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in cohorts:
+            parser.error(f"Two catalogs are named {name}")
+        try:
+            cohorts[name] = load_catalog(path)
+        except (OSError, ValueError, ImportError) as exc:
+            parser.error(str(exc))
+    try:
+        solutions = solve_batch(cohorts, engine=args.engine, workers=args.workers, seed=args.seed,
+                                max_nodes=args.max_nodes, time_limit=args.time_limit)
+    except (ValueError, ImportError) as exc:
+        parser.error(str(exc))
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as f:
+            json.dump({name: solution.trace for name, solution in solutions.items()}, f, indent=2)
+
+    root, extension = os.path.splitext(args.output)
+    for name, solution in solutions.items():
+        output = f"{root}-{name}{extension}"
+        save_schedules(solution.schedules, output)
+        for item in solution.unscheduled:
+            print(f"Could not schedule {item} ({name})", file=sys.stderr)
+        if not args.quiet:
+            status = "complete" if solution.complete else "infeasible" if solution.infeasible else "incomplete"
+            print(f"Wrote {status} schedules for {len(cohorts[name].groups)} groups of {name} to {output}")
+            if solution.limit is not None:
+                print(f"Search of {name} stopped by {describe_limit(solution.limit, args)}")
+    return 0 if all(solution.complete for solution in solutions.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
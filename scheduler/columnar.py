@@ -0,0 +1,265 @@
+"""Compact binary schedule files holding one or more snapshots.
+
+A timetable is stored as one int32 code per (group, day, slot) cell:
+
+- ``FREE`` (-1), ``UNAVAILABLE_CODE`` (-2), ``BREAK_CODE`` (-3)
+- ``n >= 0``: the n-th entry of the file's session table
+
+Layout::
+
+    b"TTBL"  uint32 format version  uint32 header length
+    header   JSON: groups, days, slots, session table, snapshot metadata
+    padding  up to a multiple of 8 bytes
+    codes    int32 little endian, shape (snapshots, groups, days, slots)
+
+The code block is read through ``mmap``, so loading one snapshot out of
+hundreds only touches that snapshot's pages. Every write goes to a temporary
+file that is renamed over the target, so readers never see a half-written
+file.
+"""
+
+import json
+import mmap
+import os
+import secrets
+import struct
+import sys
+import time
+from array import array
+
+from scheduler.session import BREAK, UNAVAILABLE, Session, to_cell
+
+MAGIC = b"TTBL"
+FORMAT_VERSION = 1
+SUFFIX = ".ttb"
+
+FREE = -1
+UNAVAILABLE_CODE = -2
+BREAK_CODE = -3
+
+_PREFIX = struct.Struct("<4sII")
+_MARKERS = {None: FREE, UNAVAILABLE: UNAVAILABLE_CODE, BREAK: BREAK_CODE}
+_CELLS = {code: cell for cell, code in _MARKERS.items()}
+
+
+def is_columnar(path):
+    """True when ``path`` starts with the binary schedule magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ScheduleFile:
+    """Read-only view of a binary schedule file; the code block stays memory mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            magic, version, header_len = _PREFIX.unpack(self._file.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a binary schedule file")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} uses format {version}, this version reads up to {FORMAT_VERSION}")
+            header = json.loads(self._file.read(header_len).decode("utf-8"))
+        except Exception:
+            self._file.close()
+            raise
+        self.groups = header["groups"]
+        self.days = header["days"]
+        self.slots = header["slots"]
+        self.sessions = [Session(*entry) for entry in header["sessions"]]
+        self.snapshots = header["snapshots"]
+        self._offset = _align(_PREFIX.size + header_len)
+        self._map = None
+        self._codes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def close(self):
+        if self._codes is not None:
+            self._codes.release()
+            self._codes = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def cells_per_snapshot(self):
+        return len(self.groups) * len(self.days) * len(self.slots)
+
+    def codes(self):
+        """The whole code block as a flat int32 ``memoryview``."""
+        if self._codes is None:
+            if not self.snapshots or not self.cells_per_snapshot:
+                return memoryview(array("i"))
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self.snapshots) * self.cells_per_snapshot * 4
+            self._codes = memoryview(self._map)[self._offset:self._offset + size].cast("i")
+        return self._codes
+
+    def snapshot_codes(self, index=-1):
+        """Codes of one snapshot, flat in (group, day, slot) order, as an ``array``."""
+        index = range(len(self.snapshots))[index]
+        n = self.cells_per_snapshot
+        codes = array("i", self.codes()[index * n:(index + 1) * n])
+        if sys.byteorder != "little":
+            codes.byteswap()
+        return codes
+
+    def load(self, index=-1):
+        """Decode snapshot ``index`` (default: the latest) into nested schedules."""
+        codes = self.snapshot_codes(index)
+        sessions = self.sessions
+        n_days, n_slots = len(self.days), len(self.slots)
+        schedules = {}
+        for g, group in enumerate(self.groups):
+            schedule = {}
+            for d, day in enumerate(self.days):
+                base = (g * n_days + d) * n_slots
+                schedule[day] = {
+                    label: sessions[code] if code >= 0 else _CELLS[code]
+                    for label, code in zip(self.slots, codes[base:base + n_slots])
+                }
+            schedules[group] = schedule
+        return schedules
+
+
+def _align(offset):
+    return offset + (-offset % 8)
+
+
+def _grid(schedules):
+    groups = list(schedules)
+    first = schedules[groups[0]] if groups else {}
+    days = list(first)
+    slots = list(first[days[0]]) if days else []
+    return groups, days, slots
+
+
+def _encode(schedules, groups, days, slots, session_index, sessions):
+    if list(schedules) != groups:
+        raise ValueError("Every snapshot in a file needs the same groups")
+    codes = array("i")
+    for group in groups:
+        schedule = schedules[group]
+        if list(schedule) != days:
+            raise ValueError(f"{group}: every snapshot in a file needs the same days")
+        for day in days:
+            cells = schedule[day]
+            if list(cells) != slots:
+                raise ValueError(f"{group} {day}: every snapshot in a file needs the same slots")
+            for label in slots:
+                cell = to_cell(cells[label], group)
+                if isinstance(cell, Session):
+                    code = session_index.get(cell)
+                    if code is None:
+                        code = session_index[cell] = len(sessions)
+                        sessions.append(cell)
+                    codes.append(code)
+                else:
+                    codes.append(_MARKERS[cell])
+    if sys.byteorder != "little":
+        codes.byteswap()
+    return codes
+
+
+def temp_file(path, suffix):
+    """A new temporary file next to ``path``; returns (fd, name).
+
+    Unlike ``tempfile.mkstemp``, which makes its files owner-only, it gets
+    the mode a plain ``open`` would give a new file (0666 less the umask).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp = os.path.join(directory, f".schedules-{secrets.token_hex(8)}{suffix}")
+        try:
+            return os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def replace_file(tmp, path):
+    """Move the temporary file ``tmp`` over ``path``, atomically, keeping the mode of the file it replaces."""
+    try:
+        os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    except FileNotFoundError:
+        pass
+    os.replace(tmp, path)
+
+
+def _write(path, groups, days, slots, sessions, snapshots, blocks):
+    """Write a file from little endian code ``blocks``."""
+    header = json.dumps({
+        "groups": groups,
+        "days": days,
+        "slots": slots,
+        "sessions": [list(session) for session in sessions],
+        "snapshots": snapshots,
+    }, separators=(",", ":")).encode("utf-8")
+    prefix = _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header))
+    padding = b"\0" * (_align(len(prefix) + len(header)) - len(prefix) - len(header))
+
+    fd, tmp = temp_file(path, SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(prefix + header + padding)
+            for block in blocks:
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        replace_file(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def save_snapshots(path, snapshots, labels=None):
+    """Write ``snapshots`` (a list of schedules) to ``path``, replacing it atomically."""
+    snapshots = list(snapshots)
+    labels = list(labels) if labels is not None else [None] * len(snapshots)
+    groups, days, slots = _grid(snapshots[0]) if snapshots else ([], [], [])
+    session_index = {}
+    sessions = []
+    blocks = [_encode(schedules, groups, days, slots, session_index, sessions) for schedules in snapshots]
+    now = time.time()
+    meta = [{"created": now, "label": label} for label in labels]
+    _write(path, groups, days, slots, sessions, meta, blocks)
+
+
+def append_snapshot(path, schedules, label=None):
+    """Add ``schedules`` as the newest snapshot of ``path`` and return its index.
+
+    The existing snapshots are copied straight from the mapped code block,
+    without being decoded.
+    """
+    if not os.path.exists(path):
+        save_snapshots(path, [schedules], [label])
+        return 0
+    with ScheduleFile(path) as existing:
+        groups, days, slots = existing.groups, existing.days, existing.slots
+        if not existing.snapshots:
+            groups, days, slots = _grid(schedules)
+        sessions = list(existing.sessions)
+        session_index = {session: code for code, session in enumerate(sessions)}
+        block = _encode(schedules, groups, days, slots, session_index, sessions)
+        meta = existing.snapshots + [{"created": time.time(), "label": label}]
+        _write(path, groups, days, slots, sessions, meta, [existing.codes(), block])
+        return len(meta) - 1
+
+
+def load_snapshot(path, index=-1):
+    """Load snapshot ``index`` (default: the latest) of a binary schedule file."""
+    with ScheduleFile(path) as f:
+        return f.load(index)
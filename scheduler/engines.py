@@ -0,0 +1,35 @@
+"""Solver engines behind one interface.
+
+An engine is a callable
+``engine(problem, seed=None, max_nodes=..., time_limit=None, stop=None, profile=None, progress=None)``
+that returns a ``Solution`` with its ``trace`` filled in, calling ``progress`` with a ``Progress`` while it
+runs. The app and the command line pick one by name:
+
+- ``csp``: the built-in FC-CBJ search (always available)
+- ``cpsat``: the exact 0/1 model on OR-Tools CP-SAT
+- ``pulp``: the exact 0/1 model on PuLP/CBC
+"""
+
+from functools import partial
+
+from scheduler.exact import CPSAT, PULP, backend_available, solve_exact
+from scheduler.solver import solve
+
+DEFAULT_ENGINE = "csp"
+
+ENGINES = {
+    "csp": solve,
+    CPSAT: partial(solve_exact, backend=CPSAT),
+    PULP: partial(solve_exact, backend=PULP),
+}
+
+
+def available_engines():
+    """Names of the engines whose solver library is installed."""
+    return [name for name in ENGINES if name == DEFAULT_ENGINE or backend_available(name)]
+
+
+def get_engine(name=DEFAULT_ENGINE):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine: {name} (choose from {', '.join(ENGINES)})")
+    return ENGINES[name]
@@ -0,0 +1,317 @@
+"""Exact engine: the timetable as a 0/1 model for an off-the-shelf solver.
+
+There is one binary column per (session, day, slot, teacher) value of the CSP
+variables, and every session takes exactly one of its values. A value of a
+multi-slot session covers every cell of its block. The hard rules
+become linear constraints:
+
+- a group or a teacher holds at most one session per (day, slot)
+- a teacher teaches on at most MAX_TEACHING_DAYS days
+- a group has at most MAX_LECTURES_PER_DAY distinct lectures per day
+- no group has more than MAX_CONSECUTIVE_SESSIONS sessions in a row
+- when rooms are modelled, a session placed at a (day, slot) takes one of
+  its suitable rooms there, and a room holds at most one session per
+  (day, slot) of the blocks placed in it
+- twin sessions of interchangeable groups take increasing values, the same
+  symmetry breaking as the CSP search (see ``scheduler.symmetry``)
+
+Blocked slots (Tuesday afternoon, ``unavailable`` days) never get a column.
+The objective is the number of sessions handed to a backup teacher.
+Rooms are columns of their own, one per (session, day, slot, room), so the
+solver hands out the rooms along with the timetable.
+
+The model is built without any solver library. ``solve_exact`` passes it to
+OR-Tools CP-SAT or to PuLP/CBC, whichever is installed
+(``pip install ortools`` or ``pip install pulp``). Both can prove that no
+timetable exists, which the CSP search can only do when it is allowed to
+run to the end.
+"""
+
+import threading
+import time
+
+from scheduler.problem import Progress, Solution
+from scheduler.solver import CSPSolver, MAX_CONSECUTIVE_SESSIONS, MAX_LECTURES_PER_DAY, MAX_TEACHING_DAYS
+from scheduler.state import iter_bits
+from scheduler.trace import Trace
+
+CPSAT = "cpsat"
+PULP = "pulp"
+BACKENDS = [CPSAT, PULP]
+
+OPTIMAL = "optimal"
+FEASIBLE = "feasible"
+INFEASIBLE = "infeasible"
+UNKNOWN = "unknown"
+
+DEFAULT_TIME_LIMIT = 60.0
+
+
+class ZeroOneModel:
+    """Backend independent 0/1 formulation of a ``Problem``.
+
+    Columns ``0 .. len(values) - 1`` are the session values, listed in
+    ``values`` as (variable index, value index). The remaining columns are
+    the rooms of the sessions, listed in ``room_columns`` as column ->
+    (variable index, room index), and auxiliary "teacher works that day" and
+    "group has that lecture that day" indicators. Every constraint in
+    ``constraints`` reads ``sum(coef * column) <= rhs``.
+    """
+
+    def __init__(self, problem):
+        self.csp = CSPSolver(problem)
+        self.values = []
+        self.n_columns = 0
+        self.exactly_one = []   # one list of columns per session
+        self.constraints = []   # ([(column, coef), ...], rhs)
+        self.objective = []     # columns that use a backup teacher
+        self.room_columns = {}  # column -> (variable, room)
+        self._build()
+
+    def _column(self):
+        self.n_columns += 1
+        return self.n_columns - 1
+
+    def _at_most(self, columns, bound):
+        if len(columns) > bound:
+            self.constraints.append(([(j, 1) for j in columns], bound))
+
+    def _build(self):
+        csp = self.csp
+        n_slots = len(csp.time_slots)
+        group_cell = {}    # (group, day, slot) -> columns
+        teacher_cell = {}  # (teacher, day, slot) -> columns
+        teacher_day = {}   # (teacher, day) -> columns
+        lecture_day = {}   # (group, day) -> {course: columns}
+        room_cell = {}     # (room, day, slot) -> room columns
+        var_columns = []   # variable -> its value columns
+
+        for var in csp.variables:
+            columns = []
+            for k, (d, s, t, backup) in enumerate(var.values):
+                j = self._column()
+                self.values.append((var.index, k))
+                columns.append(j)
+                block = range(s, s + var.length)
+                for g in var.group_ids:
+                    for cell in block:
+                        group_cell.setdefault((g, d, cell), []).append(j)
+                    if var.lecture is not None:
+                        lecture_day.setdefault((g, d), {}).setdefault(var.lecture, []).append(j)
+                for cell in block:
+                    teacher_cell.setdefault((t, d, cell), []).append(j)
+                teacher_day.setdefault((t, d), []).append(j)
+                if backup:
+                    self.objective.append(j)
+            self.exactly_one.append(columns)
+            var_columns.append(columns)
+
+        for columns in group_cell.values():
+            self._at_most(columns, 1)
+        for columns in teacher_cell.values():
+            self._at_most(columns, 1)
+
+        # The rank of the chosen value, in (day, slot, teacher) order, goes up
+        # along each chain of twin sessions
+        for x, pairs in enumerate(csp.model.lex_neighbours):
+            for y, after in pairs:
+                if not after:
+                    continue
+                first, second = csp.variables[x], csp.variables[y]
+                ranks = {value: r for r, value in enumerate(sorted({v[:3] for v in first.values + second.values}))}
+                terms = [(j, ranks[first.values[k][:3]]) for k, j in enumerate(var_columns[x])]
+                terms += [(j, -ranks[second.values[k][:3]]) for k, j in enumerate(var_columns[y])]
+                self.constraints.append((terms, -1))
+
+        # A session placed at (day, slot), whichever teacher has it, takes
+        # exactly one of its rooms there, and a room holds one session a cell
+        for var in csp.variables:
+            if var.rooms is None:
+                continue
+            starts = {}
+            for k, (d, s, _, _) in enumerate(var.values):
+                starts.setdefault((d, s), []).append(var_columns[var.index][k])
+            for (d, s), columns in starts.items():
+                rooms = []
+                for r in iter_bits(var.rooms):
+                    room = self._column()
+                    self.room_columns[room] = (var.index, r)
+                    rooms.append(room)
+                    for cell in range(s, s + var.length):
+                        room_cell.setdefault((r, d, cell), []).append(room)
+                terms = [(room, 1) for room in rooms] + [(j, -1) for j in columns]
+                self.constraints.append((terms, 0))
+                self.constraints.append(([(j, -coef) for j, coef in terms], 0))
+        for columns in room_cell.values():
+            self._at_most(columns, 1)
+
+        # A day indicator must be on for any session that day; at most
+        # n_slots sessions fit in one day, so that is enough of a big-M
+        teacher_days = {}
+        for (t, d), columns in teacher_day.items():
+            day = self._column()
+            self.constraints.append(([(j, 1) for j in columns] + [(day, -n_slots)], 0))
+            teacher_days.setdefault(t, []).append(day)
+        for days in teacher_days.values():
+            self._at_most(days, MAX_TEACHING_DAYS)
+
+        for courses in lecture_day.values():
+            lectures = []
+            for columns in courses.values():
+                lecture = self._column()
+                self.constraints.append(([(j, 1) for j in columns] + [(lecture, -n_slots)], 0))
+                lectures.append(lecture)
+            self._at_most(lectures, MAX_LECTURES_PER_DAY)
+
+        window = MAX_CONSECUTIVE_SESSIONS + 1
+        for g in range(len(csp.groups)):
+            for d in range(len(csp.days)):
+                for start in range(n_slots - window + 1):
+                    columns = [j for s in range(start, start + window) for j in group_cell.get((g, d, s), [])]
+                    self._at_most(columns, MAX_CONSECUTIVE_SESSIONS)
+
+    def assignment(self, chosen):
+        """Map the chosen session columns back to a CSP assignment."""
+        values = self.csp.variables
+        return {x: values[x].values[k] for x, k in (self.values[j] for j in chosen if j < len(self.values))}
+
+    def rooms(self, chosen):
+        """Map the chosen room columns to the room index of each variable."""
+        return dict(self.room_columns[j] for j in chosen if j in self.room_columns)
+
+
+def _solve_cpsat(model, time_limit, seed, stop):
+    from ortools.sat.python import cp_model
+
+    cp = cp_model.CpModel()
+    columns = [cp.new_bool_var(f"x{j}") for j in range(model.n_columns)]
+    for session in model.exactly_one:
+        cp.add_exactly_one(columns[j] for j in session)
+    for terms, rhs in model.constraints:
+        if rhs == 1 and all(coef == 1 for _, coef in terms):
+            cp.add_at_most_one(columns[j] for j, _ in terms)
+        else:
+            cp.add(sum(coef * columns[j] for j, coef in terms) <= rhs)
+    if model.objective:
+        cp.minimize(sum(columns[j] for j in model.objective))
+
+    solver = cp_model.CpSolver()
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    if seed is not None:
+        solver.parameters.random_seed = seed
+
+    done = threading.Event()
+    if stop is not None:
+        def watch():
+            while not done.wait(0.1):
+                if stop.is_set():
+                    solver.stop_search()
+                    return
+        threading.Thread(target=watch, daemon=True).start()
+    try:
+        status = solver.solve(cp)
+    finally:
+        done.set()
+
+    stats = (solver.num_branches, solver.num_conflicts)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        chosen = [j for j in range(model.n_columns) if solver.boolean_value(columns[j])]
+        return (OPTIMAL if status == cp_model.OPTIMAL else FEASIBLE), chosen, stats
+    if status == cp_model.INFEASIBLE:
+        return INFEASIBLE, [], stats
+    return UNKNOWN, [], stats
+
+
+def _solve_pulp(model, time_limit, seed, stop):
+    import pulp
+
+    lp = pulp.LpProblem("timetable", pulp.LpMinimize)
+    columns = [pulp.LpVariable(f"x{j}", cat=pulp.LpBinary) for j in range(model.n_columns)]
+    lp += pulp.lpSum(columns[j] for j in model.objective)
+    for session in model.exactly_one:
+        lp += pulp.lpSum(columns[j] for j in session) == 1
+    for terms, rhs in model.constraints:
+        lp += pulp.lpSum(coef * columns[j] for j, coef in terms) <= rhs
+
+    options = [f"randomSeed {seed}"] if seed is not None else []
+    lp.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, options=options))
+
+    if lp.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        chosen = [j for j in range(model.n_columns) if (columns[j].varValue or 0) > 0.5]
+        return (OPTIMAL if lp.sol_status == pulp.LpSolutionOptimal else FEASIBLE), chosen, (0, 0)
+    if lp.sol_status == pulp.LpSolutionInfeasible:
+        return INFEASIBLE, [], (0, 0)
+    return UNKNOWN, [], (0, 0)
+
+
+_BACKEND_SOLVERS = {CPSAT: (_solve_cpsat, "ortools"), PULP: (_solve_pulp, "pulp")}
+
+
+def backend_available(backend):
+    """True when the library behind ``backend`` can be imported."""
+    _, module = _BACKEND_SOLVERS[backend]
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def solve_exact(problem, backend=None, seed=None, max_nodes=None, time_limit=DEFAULT_TIME_LIMIT, stop=None,
+                profile=None, progress=None):
+    """Solve ``problem`` with a 0/1 model and return a ``Solution``.
+
+    ``backend`` is ``"cpsat"`` or ``"pulp"``; by default the first installed
+    one is used. ``max_nodes`` is accepted for interface compatibility with
+    the CSP engine and ignored. The PuLP backend only honours ``stop`` when
+    it is set before the solve starts. ``Solution.infeasible`` is set when
+    the backend proved that no complete timetable exists. ``profile`` runs
+    the whole solve under a profiler (see ``Trace.profiled``). ``progress``
+    gets a single ``Progress`` once the model is built: the backends report
+    nothing while they run.
+    """
+    if backend is None:
+        backend = next((name for name in BACKENDS if backend_available(name)), None)
+        if backend is None:
+            raise ImportError("The exact engine needs OR-Tools or PuLP: pip install ortools (or pulp)")
+    if backend not in _BACKEND_SOLVERS:
+        raise ValueError(f"Unknown exact backend: {backend}")
+    if not backend_available(backend):
+        raise ImportError(f"The {backend} engine needs {_BACKEND_SOLVERS[backend][1]}: "
+                          f"pip install {_BACKEND_SOLVERS[backend][1]}")
+
+    started = time.perf_counter()
+    trace = Trace(backend)
+    with trace.profiled(profile):
+        with trace.phase("build"):
+            model = ZeroOneModel(problem)
+        trace.count("columns", model.n_columns)
+        trace.count("constraints", len(model.exactly_one) + len(model.constraints))
+        if progress is not None:
+            progress(Progress(engine=backend, total=len(model.exactly_one), elapsed=time.perf_counter() - started))
+        if stop is not None and stop.is_set():
+            status, chosen, (nodes, backtracks) = UNKNOWN, [], (0, 0)
+        else:
+            run, _ = _BACKEND_SOLVERS[backend]
+            with trace.phase("solve"):
+                status, chosen, (nodes, backtracks) = run(model, time_limit, seed, stop)
+        trace.count("nodes", nodes)
+        trace.count("backtracks", backtracks)
+
+        assignment = model.assignment(chosen)
+        csp = model.csp
+        with trace.phase("render"):
+            schedules = csp.to_schedules(assignment, model.rooms(chosen))
+    return Solution(
+        schedules=schedules,
+        complete=status in (OPTIMAL, FEASIBLE),
+        unscheduled=csp.unscheduled(assignment),
+        seed=seed,
+        nodes=nodes,
+        backtracks=backtracks,
+        elapsed=time.perf_counter() - started,
+        infeasible=status == INFEASIBLE,
+        limit=("stop" if stop is not None and stop.is_set() else "time") if status == UNKNOWN else None,
+        trace=trace.to_dict(),
+    )
@@ -0,0 +1,136 @@
+"""Dense (group, day, slot) view of a timetable for vectorized analytics.
+
+``ScheduleGrid`` holds a timetable as an int32 array of session codes, the
+same codes as the binary schedule files (``scheduler.columnar``): ``n >= 0``
+is the n-th entry of the session table, negative codes are free,
+unavailable or break cells. Per-session attributes (teacher, course, lecture
+or not) are small arrays indexed by code, so the workload and daily load
+figures are a gather and a ``bincount``/``unique`` over the occupied cells
+instead of nested loops over groups, days and slots.
+
+Needs NumPy (installed with Streamlit and pandas); the rest of the package
+does not import this module.
+"""
+
+import numpy as np
+
+from scheduler.columnar import BREAK_CODE, FREE, UNAVAILABLE_CODE
+from scheduler.session import BREAK, UNAVAILABLE, Session, to_cell
+
+_MARKERS = {None: FREE, UNAVAILABLE: UNAVAILABLE_CODE, BREAK: BREAK_CODE}
+
+
+class ScheduleGrid:
+    """Session codes of one timetable, shape (groups, days, slots)."""
+
+    def __init__(self, codes, sessions, groups, days, slots):
+        self.groups = list(groups)
+        self.days = list(days)
+        self.slots = list(slots)
+        self.sessions = list(sessions)
+        self.codes = np.asarray(codes, dtype=np.int32).reshape(len(self.groups), len(self.days), len(self.slots))
+
+        teachers = {}
+        courses = {}
+        self.session_teacher = np.array(
+            [teachers.setdefault(session.teacher, len(teachers)) for session in self.sessions], dtype=np.int64)
+        self.session_course = np.array(
+            [courses.setdefault(session.course, len(courses)) for session in self.sessions], dtype=np.int64)
+        self.session_lecture = np.array([session.is_lecture for session in self.sessions], dtype=bool)
+        self.teachers = list(teachers)
+        self.courses = list(courses)
+
+        # Occupied cells in (group, day, slot) order, with their codes
+        g, d, s = np.nonzero(self.codes >= 0)
+        self._cells = (g, d, s, self.codes[g, d, s].astype(np.int64))
+
+    @classmethod
+    def from_schedules(cls, problem, schedules):
+        """Encode nested schedules on ``problem``'s groups, days and slots."""
+        slots = problem.slot_labels
+        index = {}
+        sessions = []
+        codes = []
+        for group in problem.groups:
+            schedule = schedules.get(group, {})
+            for day in problem.days:
+                cells = schedule.get(day, {})
+                for label in slots:
+                    cell = to_cell(cells.get(label), group)
+                    if isinstance(cell, Session):
+                        code = index.get(cell)
+                        if code is None:
+                            code = index[cell] = len(sessions)
+                            sessions.append(cell)
+                        codes.append(code)
+                    else:
+                        codes.append(_MARKERS.get(cell, FREE))
+        return cls(codes, sessions, problem.groups, problem.days, slots)
+
+    @classmethod
+    def from_file(cls, schedule_file, index=-1):
+        """Grid of one snapshot of an open ``ScheduleFile``, without decoding its cells."""
+        codes = np.frombuffer(schedule_file.snapshot_codes(index), dtype=np.int32)
+        return cls(codes, schedule_file.sessions, schedule_file.groups, schedule_file.days, schedule_file.slots)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def teacher_day_sessions(self):
+        """(teachers, days) group sessions per teacher; a shared lecture counts once per group."""
+        n_teachers, n_days = len(self.teachers), len(self.days)
+        _, d, _, code = self._cells
+        keys = self.session_teacher[code] * n_days + d
+        return np.bincount(keys, minlength=n_teachers * n_days).reshape(n_teachers, n_days)
+
+    def teacher_days(self):
+        """(teachers, days) True where the teacher teaches that day."""
+        return self.teacher_day_sessions() > 0
+
+    def teacher_slot_load(self):
+        """(teachers, days, slots) distinct sessions per teacher and cell; above 1 is a clash."""
+        n_teachers, n_days, n_slots = len(self.teachers), len(self.days), len(self.slots)
+        _, d, s, code = self._cells
+        # A shared lecture sits in every group's cell under the same code
+        code, cell = np.divmod(np.unique((code * n_days + d) * n_slots + s), n_days * n_slots)
+        keys = self.session_teacher[code] * (n_days * n_slots) + cell
+        return np.bincount(keys, minlength=n_teachers * n_days * n_slots).reshape(n_teachers, n_days, n_slots)
+
+    def group_day_sessions(self):
+        """(groups, days) sessions per group and day."""
+        return (self.codes >= 0).sum(axis=2)
+
+    def utilization(self):
+        """(groups, days) share of the open slots (not unavailable or a break) that hold a session."""
+        open_cells = ((self.codes >= 0) | (self.codes == FREE)).sum(axis=2)
+        return np.divide(self.group_day_sessions(), open_cells,
+                         out=np.zeros(open_cells.shape), where=open_cells > 0)
+
+    def _lecture_keys(self):
+        g, d, _, code = self._cells
+        lecture = self.session_lecture[code]
+        row = g[lecture] * len(self.days) + d[lecture]
+        return row * len(self.courses) + self.session_course[code[lecture]]
+
+    def lectures_per_day(self):
+        """(groups, days) distinct courses lectured per group and day."""
+        n_rows = len(self.groups) * len(self.days)
+        if not self.courses:
+            return np.zeros((len(self.groups), len(self.days)), dtype=np.int64)
+        rows = np.unique(self._lecture_keys()) // len(self.courses)
+        return np.bincount(rows, minlength=n_rows).reshape(len(self.groups), len(self.days))
+
+    def daily_lectures(self):
+        """Courses lectured per group and day in slot order, as nested lists [group][day]."""
+        lectures = [[[] for _ in self.days] for _ in self.groups]
+        if not self.courses:
+            return lectures
+        keys, first = np.unique(self._lecture_keys(), return_index=True)
+        # Occupied cells are in (group, day, slot) order, so sorting by first
+        # occurrence lists each row's courses in slot order
+        n_days, n_courses = len(self.days), len(self.courses)
+        for key in keys[np.argsort(first, kind="stable")].tolist():
+            row, course = divmod(key, n_courses)
+            lectures[row // n_days][row % n_days].append(self.courses[course])
+        return lectures
@@ -0,0 +1,270 @@
+"""Course catalogs from files, validated and compiled once.
+
+``load_catalog`` reads a catalog in one of three formats:
+
+- JSON (``.json``): the keys of ``Problem``; missing keys use the built-in
+  catalog, except that a file with its own ``courses`` starts from empty
+  additional, backup and component backup teacher tables
+- YAML (``.yaml``/``.yml``): the same structure, needs PyYAML
+- CSV (``.csv``): one row per teacher of a component, with the columns
+  ``course,component,teacher,shared`` (and optional ``hours``, ``slots``
+  and ``per_week``); groups, days and slots come from the built-in catalog
+
+The data is checked by ``validate_catalog`` and compiled into the solver's
+``Model`` (interned teacher ids, candidate teachers per session, domains,
+clash neighbours). The problem and its model are pickled in ``cache_dir``
+under the hash of the file's bytes and of the code that compiles it, so
+loading an unchanged file again skips parsing, validation and compilation,
+and a pickle written by other code is never picked up.
+"""
+
+import csv
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import pickle
+
+from scheduler.problem import Problem
+from scheduler.solver import Model, remember_model
+
+DEFAULT_CACHE_DIR = ".catalog_cache"
+# Bump when Problem or Model change shape, so stale pickles are ignored
+CACHE_VERSION = 6
+# Modules that decide what a cached problem and model hold
+COMPILER_MODULES = ("catalog.py", "loader.py", "problem.py", "solver.py", "symmetry.py")
+
+CSV_COLUMNS = ["course", "component", "teacher", "shared"]
+_TRUE = {"1", "true", "yes", "y", "shared"}
+_FALSE = {"", "0", "false", "no", "n", "separate"}
+
+
+def parse_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("YAML catalogs need PyYAML: pip install pyyaml") from None
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def parse_csv(path):
+    """Courses from a CSV table with one row per (course, component, teacher)."""
+    courses = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path}: missing CSV columns: {', '.join(missing)}")
+        for line, row in enumerate(reader, start=2):
+            shared = (row["shared"] or "").strip().lower()
+            if shared not in _TRUE | _FALSE:
+                raise ValueError(f"{path}:{line}: shared must be true or false, not {row['shared']!r}")
+            entry = {"teacher": (row["teacher"] or "").strip(), "shared": shared in _TRUE}
+            if (row.get("hours") or "").strip():
+                entry["hours"] = float(row["hours"])
+            for key in ("slots", "per_week"):
+                if (row.get(key) or "").strip():
+                    entry[key] = int(row[key])
+            component = courses.setdefault(row["course"].strip(), {}).setdefault(row["component"].strip(), [])
+            component.append(entry)
+    # Single-teacher components use the plain dict form, like the built-in catalog
+    for components in courses.values():
+        for name, entries in components.items():
+            if len(entries) == 1:
+                components[name] = entries[0]
+    return {"courses": courses}
+
+
+PARSERS = {
+    ".json": parse_json,
+    ".yaml": parse_yaml,
+    ".yml": parse_yaml,
+    ".csv": parse_csv,
+}
+
+
+def validate_catalog(problem):
+    """Check a problem for inconsistent catalog data; raise ValueError listing every issue."""
+    issues = []
+
+    def duplicates(items, what):
+        seen = set()
+        for item in items:
+            if item in seen:
+                issues.append(f"duplicate {what}: {item}")
+            seen.add(item)
+
+    duplicates(problem.groups, "group")
+    duplicates(problem.days, "day")
+    duplicates(problem.slot_labels, "time slot")
+    if not problem.groups:
+        issues.append("no groups")
+    for slot in problem.time_slots:
+        for day in slot.get("unavailable", []):
+            if day not in problem.days:
+                issues.append(f"time slot {slot['label']}: unknown day {day}")
+
+    if not problem.courses:
+        issues.append("no courses")
+    for course, components in problem.courses.items():
+        if not isinstance(components, dict) or not components:
+            issues.append(f"{course}: needs at least one component")
+            continue
+        for component, details in components.items():
+            entries = details if isinstance(details, list) else [details]
+            if not entries:
+                issues.append(f"{course} {component}: no teacher")
+            for entry in entries:
+                if not isinstance(entry, dict) or not isinstance(entry.get("teacher"), str) or not entry["teacher"]:
+                    issues.append(f"{course} {component}: every entry needs a teacher name")
+                elif not isinstance(entry.get("shared", False), bool):
+                    issues.append(f"{course} {component}: shared must be true or false")
+                elif "room_type" in entry and not isinstance(entry["room_type"], str):
+                    issues.append(f"{course} {component}: room_type must be a string")
+                elif "hours" in entry and (not isinstance(entry["hours"], (int, float)) or entry["hours"] <= 0):
+                    issues.append(f"{course} {component}: hours must be a positive number")
+                else:
+                    for key in ("slots", "per_week"):
+                        if key in entry and (not isinstance(entry[key], int) or entry[key] < 1):
+                            issues.append(f"{course} {component}: {key} must be a positive integer")
+
+    # Entries for courses that are not in the catalog are never used (the
+    # built-in tables still carry some), only the ones that apply are checked
+    for course, components in problem.additional_teachers.items():
+        for component, teachers in components.items():
+            if component in problem.courses.get(course, {}) and not teachers:
+                issues.append(f"additional teachers for {course} {component}: empty list")
+    duplicates([room.get("name") for room in problem.rooms if isinstance(room, dict)], "room")
+    for room in problem.rooms:
+        if not isinstance(room, dict) or not isinstance(room.get("name"), str) or not room["name"]:
+            issues.append("every room needs a name")
+            continue
+        capacity = room.get("capacity")
+        if capacity is not None and (not isinstance(capacity, int) or capacity < 1):
+            issues.append(f"room {room['name']}: capacity must be a positive integer")
+        if not isinstance(room.get("type", ""), str):
+            issues.append(f"room {room['name']}: type must be a string")
+    for course, groups in problem.course_groups.items():
+        if course not in problem.courses:
+            issues.append(f"course groups for unknown course {course}")
+        for group in groups:
+            if group not in problem.groups:
+                issues.append(f"course groups of {course}: unknown group {group}")
+    for course, backups in problem.backup_teachers.items():
+        if isinstance(backups, dict) and course in problem.courses:
+            for component in backups:
+                if component not in problem.courses[course]:
+                    issues.append(f"backup teachers for {course}: unknown component {component}")
+    for group, size in problem.group_sizes.items():
+        if group not in problem.groups:
+            issues.append(f"group size for unknown group {group}")
+        elif not isinstance(size, int) or size < 1:
+            issues.append(f"group size of {group} must be a positive integer")
+
+    for teacher, days in problem.teacher_unavailable.items():
+        for day, labels in days.items():
+            if day not in problem.days:
+                issues.append(f"unavailability of {teacher}: unknown day {day}")
+            for label in labels:
+                if label not in problem.slot_labels:
+                    issues.append(f"unavailability of {teacher}: unknown time slot {label}")
+
+    if issues:
+        raise ValueError("Invalid catalog:\n- " + "\n- ".join(issues))
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def code_hash():
+    """Hash of the compiler modules, so that any edit to them invalidates the cache."""
+    digest = hashlib.blake2b(digest_size=8)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in COMPILER_MODULES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_HASH = code_hash()
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}-v{CACHE_VERSION}-{CODE_HASH}.pickle")
+
+
+@functools.lru_cache(maxsize=1)
+def _expected_fields():
+    """Attributes of a problem, a model and a variable compiled by this code."""
+    model = Model(Problem())
+    return (
+        {field.name for field in dataclasses.fields(Problem)},
+        set(vars(model)),
+        set(vars(model.variables[0])),
+    )
+
+
+def _fits(problem, model):
+    """True when an unpickled problem and model have every field this code reads."""
+    problem_fields, model_fields, variable_fields = _expected_fields()
+    return (
+        isinstance(problem, Problem) and isinstance(model, Model)
+        and problem_fields <= set(vars(problem)) and model_fields <= set(vars(model))
+        and all(variable_fields <= set(vars(var)) for var in model.variables)
+    )
+
+
+def load_catalog(path, cache_dir=DEFAULT_CACHE_DIR):
+    """Load, validate and compile the catalog in ``path``; returns a ``Problem``.
+
+    The compiled model goes into the solver's model cache, so the first
+    solve does not compile it again. Pass ``cache_dir=None`` to skip the
+    on-disk cache.
+    """
+    cached = None
+    if cache_dir is not None:
+        cached = _cache_path(cache_dir, file_hash(path))
+        try:
+            with open(cached, "rb") as f:
+                problem, model = pickle.load(f)
+            # A pickle of an older shape loads fine but would fail in the
+            # solver: treat it as a miss
+            if _fits(problem, model):
+                remember_model(model)
+                return problem
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+            pass
+
+    extension = os.path.splitext(path)[1].lower()
+    parser = PARSERS.get(extension)
+    if parser is None:
+        raise ValueError(f"Unknown catalog format {extension!r} (use {', '.join(PARSERS)})")
+    data = parser(path)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: the catalog must be a mapping of Problem fields")
+    # The built-in teacher tables belong to the built-in courses, and so does
+    # the roster of component backups
+    if "courses" in data:
+        for key in ("additional_teachers", "backup_teachers", "component_backup_teachers"):
+            data.setdefault(key, {})
+    problem = Problem.from_dict(data)
+    validate_catalog(problem)
+    model = Model(problem)
+    remember_model(model)
+
+    if cached is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((problem, model), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+    return problem
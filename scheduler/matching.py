@@ -0,0 +1,248 @@
+"""Teacher assignment as a min-cost matching, to use as few backups as possible.
+
+Once every session has its (day, slot), choosing who teaches what is a
+bipartite matching between sessions and (teacher, day, slot) cells: a cell
+takes at most one session, a session goes to its primary teacher at cost 0
+or to one of its backups (course backups, then component backups) at cost 1.
+``assign_teachers`` solves it as a min-cost flow:
+
+1. a max flow over the cost-0 edges only (Dinic), which already has the
+   least cost for its value since nothing cheaper exists
+2. successive shortest paths (Dijkstra with potentials) for the sessions
+   left, each one adding the cheapest backup reassignment available
+
+Shared lectures and multi-slot sessions keep their teacher: a block needs
+several cells of the same teacher at once, which a flow cannot express.
+They still occupy their teacher's cells and days.
+
+The 2-day cap is not a flow capacity (it counts distinct days), so it is
+enforced in rounds: when the matching gives a teacher too many days, the
+teacher is restricted to the days it already had plus the ones it was
+matched to most, and the matching runs again. Each teacher is restricted
+at most once and the input assignment fits every round, so the result is
+never worse than the input, and it is optimal when no round was needed.
+"""
+
+import heapq
+
+INF = float("inf")
+
+
+class FlowNetwork:
+    """Residual graph with integer capacities and costs; edge ``e ^ 1`` is the reverse of ``e``."""
+
+    def __init__(self, n_nodes=0):
+        self.edges = [[] for _ in range(n_nodes)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_node(self):
+        self.edges.append([])
+        return len(self.edges) - 1
+
+    def add_edge(self, u, v, cap, cost=0):
+        """Add an edge and its reverse; returns the forward edge id."""
+        e = len(self.to)
+        self.edges[u].append(e)
+        self.to.append(v)
+        self.cap.append(cap)
+        self.cost.append(cost)
+        self.edges[v].append(e + 1)
+        self.to.append(u)
+        self.cap.append(0)
+        self.cost.append(-cost)
+        return e
+
+    def flow(self, e):
+        return self.cap[e ^ 1]
+
+    def min_cost_flow(self, source, sink):
+        """Push as much flow as possible at the least cost; returns (flow, cost)."""
+        flow = self._zero_cost_flow(source, sink)
+        # Only cost-0 edges carry flow, so every residual edge has a
+        # non-negative cost and zero potentials are valid
+        potential = [0] * len(self.edges)
+        while True:
+            pushed = self._cheapest_path(source, sink, potential)
+            if not pushed:
+                break
+            flow += pushed
+        cost = sum(self.cost[e] * self.cap[e ^ 1] for e in range(0, len(self.to), 2))
+        return flow, cost
+
+    def _zero_cost_flow(self, source, sink):
+        """Dinic's max flow restricted to edges of cost 0."""
+        total = 0
+        while True:
+            level = [-1] * len(self.edges)
+            level[source] = 0
+            queue = [source]
+            for u in queue:
+                for e in self.edges[u]:
+                    v = self.to[e]
+                    if self.cap[e] > 0 and self.cost[e] == 0 and level[v] < 0:
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[sink] < 0:
+                return total
+            current = [0] * len(self.edges)
+            while True:
+                pushed = self._blocking_path(source, sink, level, current)
+                if not pushed:
+                    break
+                total += pushed
+
+    def _blocking_path(self, source, sink, level, current):
+        """One augmenting path in the level graph, found without recursion."""
+        path = []
+        u = source
+        while u != sink:
+            edges = self.edges[u]
+            while current[u] < len(edges):
+                e = edges[current[u]]
+                v = self.to[e]
+                if self.cap[e] > 0 and self.cost[e] == 0 and level[v] == level[u] + 1:
+                    break
+                current[u] += 1
+            else:
+                # Dead end: drop the node from the level graph and step back
+                if not path:
+                    return 0
+                level[u] = -1
+                u = self.to[path.pop() ^ 1]
+                current[u] += 1
+                continue
+            path.append(e)
+            u = v
+        pushed = min(self.cap[e] for e in path)
+        for e in path:
+            self.cap[e] -= pushed
+            self.cap[e ^ 1] += pushed
+        return pushed
+
+    def _cheapest_path(self, source, sink, potential):
+        """Augment along a shortest path by reduced cost; returns the flow pushed."""
+        dist = [INF] * len(self.edges)
+        previous = [-1] * len(self.edges)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in self.edges[u]:
+                if self.cap[e] <= 0:
+                    continue
+                v = self.to[e]
+                nd = d + self.cost[e] + potential[u] - potential[v]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    previous[v] = e
+                    heapq.heappush(heap, (nd, v))
+        if dist[sink] == INF:
+            return 0
+        for v, d in enumerate(dist):
+            if d < INF:
+                potential[v] += d
+        path = []
+        v = sink
+        while v != source:
+            e = previous[v]
+            path.append(e)
+            v = self.to[e ^ 1]
+        pushed = min(self.cap[e] for e in path)
+        for e in path:
+            self.cap[e] -= pushed
+            self.cap[e ^ 1] += pushed
+        return pushed
+
+
+def _match(movable, candidates, busy, allowed):
+    """Min-cost matching of ``movable`` variables to free teacher cells, or None if one is left out."""
+    network = FlowNetwork(2)
+    source, sink = 0, 1
+    cells = {}
+    edges = []
+    for x, (d, s) in movable.items():
+        node = network.add_node()
+        network.add_edge(source, node, 1)
+        for t, backup in candidates[x]:
+            if (t, d, s) in busy or d not in allowed[t]:
+                continue
+            cell = cells.get((t, d, s))
+            if cell is None:
+                cell = cells[(t, d, s)] = network.add_node()
+                network.add_edge(cell, sink, 1)
+            edges.append((network.add_edge(node, cell, 1, int(backup)), x, (d, s, t, backup)))
+    flow, _ = network.min_cost_flow(source, sink)
+    if flow < len(movable):
+        return None
+    return {x: value for e, x, value in edges if network.flow(e)}
+
+
+def assign_teachers(solver, assignment, max_days):
+    """Re-pick the teachers of ``assignment`` to use as few backups as possible.
+
+    Days and slots stay as they are, so every group-side rule still holds;
+    ``max_days`` is the number of days a teacher may teach on.
+    Returns a new assignment, or ``assignment`` itself when no better one
+    was found.
+    """
+    variables = solver.variables
+    pinned_days = {}
+    busy = set()
+    movable = {}
+    for x, (d, s, t, _) in assignment.items():
+        var = variables[x]
+        if var.shared or var.length > 1:
+            pinned_days.setdefault(t, set()).add(d)
+            busy.update((t, d, s + j) for j in range(var.length))
+        else:
+            movable[x] = (d, s)
+    if not movable:
+        return assignment
+
+    # Teachers allowed on each session's (day, slot), from the domain, which
+    # already leaves out the teachers' unavailable slots
+    candidates = {
+        x: [(t, backup) for vd, vs, t, backup in variables[x].values if (vd, vs) == cell]
+        for x, cell in movable.items()
+    }
+
+    # A teacher keeps the days it teaches on in ``assignment``, so that
+    # assignment stays a feasible matching in every round; one with days to
+    # spare may start on any day until the matching overshoots
+    days = {}
+    for d, _, t, _ in assignment.values():
+        days.setdefault(t, set()).add(d)
+    every_day = set(range(len(solver.days)))
+    allowed = {
+        t: set(days.get(t, ())) if len(days.get(t, ())) >= max_days else every_day
+        for t in range(len(solver.teachers))
+    }
+    while True:
+        matched = _match(movable, candidates, busy, allowed)
+        if matched is None:
+            return assignment
+        sessions = {}
+        for d, _, t, _ in matched.values():
+            sessions.setdefault(t, {}).setdefault(d, 0)
+            sessions[t][d] += 1
+        over = False
+        for t, by_day in sessions.items():
+            kept = days.get(t, set())
+            if len(kept | pinned_days.get(t, set()) | set(by_day)) > max_days:
+                # Top the teacher's own days up with the ones it is matched
+                # to most, and nothing else from now on
+                extra = sorted((d for d in by_day if d not in kept), key=lambda d: (-by_day[d], d))
+                allowed[t] = kept | set(extra[:max_days - len(kept)])
+                over = True
+        if not over:
+            break
+
+    result = dict(assignment)
+    result.update(matched)
+    if sum(value[3] for value in result.values()) >= sum(value[3] for value in assignment.values()):
+        return assignment
+    return result
@@ -0,0 +1,234 @@
+"""Nogoods learned by the search, kept across restarts and solves.
+
+When a session runs out of values, conflict-directed backjumping finds the
+past assignments to blame for it (the conflict set). Together they can never
+be completed, so the solver records them as a nogood: a set of
+``(variable, value index)`` literals. As soon as every literal of a nogood
+but one holds, the value of the last one is pruned with the others as its
+reason, so the search never walks into the same dead end twice, not even
+after a restart. Each nogood is watched on two literals that do not hold,
+as in SAT solvers: only an assignment that makes a watched literal hold
+looks at the nogood, and backtracking never has to touch the watches.
+
+A ``Nogoods`` store also keeps a conflict weight per session (how many dead
+ends it took part in); variable ordering breaks MRV ties on it, which is what
+sends a restarted search down a different path.
+
+Literals index one compiled model, so nogoods are only reused on a problem
+with the same fingerprint and the same symmetry breaking. Weights are keyed
+by session (course, component, occurrence, groups), so an edited catalog
+still starts from the weights of the last one. ``learned_nogoods`` keeps the
+stores of recent problems in the process and, with a ``cache_dir``, on disk.
+Solves may run on several threads at once (the app runs each session's on
+its own), so every solve learns into a private copy of the store and
+``remember_nogoods`` merges it back under a lock::
+
+    nogoods = learned_nogoods(model.fingerprint, symmetric=True, cache_dir=".catalog_cache")
+    ...  # the solve learns into nogoods
+    save_nogoods(remember_nogoods(nogoods), ".catalog_cache")
+"""
+
+import glob
+import os
+import pickle
+import threading
+
+# Longer conflict sets rarely hold again; they are not worth their upkeep
+MAX_NOGOOD_SIZE = 64
+# Oldest nogoods go first past this many
+MAX_NOGOODS = 20000
+# Bump when the values of compiled models change order, so stale files are ignored
+NOGOODS_VERSION = 1
+
+
+def session_key(var):
+    """Key of a session that survives catalog edits that keep it."""
+    return (var.course, var.component, var.occurrence, tuple(var.groups))
+
+
+class Nogoods:
+    """Learned nogoods of one model, watched by literal, and conflict weights by session."""
+
+    def __init__(self, fingerprint=None, symmetric=False):
+        self.fingerprint = fingerprint
+        self.symmetric = symmetric
+        self.nogoods = {}  # sorted literal tuple -> literal list, watched first two, oldest first
+        self.watches = {}  # literal -> literal lists watching it
+        self.weights = {}  # session key -> dead ends
+        self.units = set()  # literals ruled out on their own
+        self.base_weights = {}  # weights when copied from the shared store
+
+    def __len__(self):
+        return len(self.nogoods) + len(self.units)
+
+    def add(self, literals, watch=()):
+        """Record a nogood watched on ``watch`` (or any two literals).
+
+        Returns False for one that is too long or already known.
+        """
+        key = tuple(sorted(literals))
+        if (not key or len(key) > MAX_NOGOOD_SIZE or key in self.nogoods
+                or any(literal in self.units for literal in key)):
+            return False
+        if len(key) == 1:
+            self.units.add(key[0])
+            return True
+        nogood = list(watch) + [literal for literal in key if literal not in watch]
+        self.nogoods[key] = nogood
+        for literal in nogood[:2]:
+            self.watches.setdefault(literal, []).append(nogood)
+        while len(self.nogoods) > MAX_NOGOODS:
+            oldest = self.nogoods.pop(next(iter(self.nogoods)))
+            for literal in oldest[:2]:
+                self.watches[literal].remove(oldest)
+        return True
+
+    def units_after(self, literal, value_index):
+        """Nogoods that hold but for their second literal now that ``literal`` holds.
+
+        ``value_index`` gives the value index of every assigned variable
+        (None for the others). Nogoods with another literal that does not
+        hold move their watch onto it instead.
+        """
+        watching = self.watches.get(literal)
+        if not watching:
+            return []
+        kept = []
+        units = []
+        for nogood in watching:
+            if nogood[0] != literal:
+                nogood[0], nogood[1] = nogood[1], nogood[0]
+            for i in range(2, len(nogood)):
+                y, j = nogood[i]
+                if value_index[y] != j:
+                    nogood[0], nogood[i] = nogood[i], literal
+                    self.watches.setdefault(nogood[0], []).append(nogood)
+                    break
+            else:
+                kept.append(nogood)
+                units.append(nogood)
+        self.watches[literal] = kept
+        return units
+
+    def bump(self, key):
+        self.weights[key] = self.weights.get(key, 0) + 1
+
+    def copy(self):
+        """An independent store with the same nogoods and weights, watched afresh."""
+        other = Nogoods(self.fingerprint, self.symmetric)
+        other.units = set(self.units)
+        for key, nogood in self.nogoods.items():
+            nogood = list(nogood)
+            other.nogoods[key] = nogood
+            for literal in nogood[:2]:
+                other.watches.setdefault(literal, []).append(nogood)
+        other.weights = dict(self.weights)
+        other.base_weights = dict(self.weights)
+        return other
+
+    def merge(self, other):
+        """Add what ``other``, a copy of this store, learned since it was copied."""
+        for literal in other.units:
+            self.add([literal])
+        for nogood in other.nogoods.values():
+            self.add(nogood)
+        for key, weight in other.weights.items():
+            gained = weight - other.base_weights.get(key, 0)
+            if gained:
+                self.weights[key] = self.weights.get(key, 0) + gained
+
+    def __getstate__(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "symmetric": self.symmetric,
+            "nogoods": list(self.nogoods.values()),
+            "units": sorted(self.units),
+            "weights": self.weights,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["fingerprint"], state["symmetric"])
+        self.weights = state["weights"]
+        for literal in state["units"]:
+            self.add([literal])
+        for nogood in state["nogoods"]:
+            self.add(nogood)
+
+
+# Stores of recently solved problems by (fingerprint, symmetric), latest
+# last; only ever read or changed under _lock
+_learned = {}
+_lock = threading.Lock()
+LEARNED_CACHE_SIZE = 8
+
+
+def _path(cache_dir, fingerprint, symmetric):
+    return os.path.join(cache_dir, f"{fingerprint}-{'s' if symmetric else 'a'}-v{NOGOODS_VERSION}.nogoods")
+
+
+def _load(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, ValueError):
+        return None
+
+
+def _keep(nogoods):
+    _learned.pop((nogoods.fingerprint, nogoods.symmetric), None)
+    _learned[(nogoods.fingerprint, nogoods.symmetric)] = nogoods
+    while len(_learned) > LEARNED_CACHE_SIZE:
+        del _learned[next(iter(_learned))]
+
+
+def learned_nogoods(fingerprint, symmetric, cache_dir=None):
+    """A private copy of what was learned on ``fingerprint`` so far.
+
+    Looks in the process first, then in ``cache_dir``. A problem seen for the
+    first time gets an empty store that starts from the weights of the last
+    one, usually the same catalog before an edit. Hand the copy to
+    ``remember_nogoods`` once the solve is over.
+    """
+    key = (fingerprint, symmetric)
+    with _lock:
+        nogoods = _learned.get(key)
+        latest = next(reversed(_learned.values()), None)
+    if nogoods is None and cache_dir is not None:
+        nogoods = _load(_path(cache_dir, fingerprint, symmetric))
+    if nogoods is None:
+        nogoods = Nogoods(fingerprint, symmetric)
+        if latest is None and cache_dir is not None:
+            files = glob.glob(os.path.join(cache_dir, f"*-v{NOGOODS_VERSION}.nogoods"))
+            latest = _load(max(files, key=os.path.getmtime)) if files else None
+        if latest is not None:
+            with _lock:
+                nogoods.weights = dict(latest.weights)
+    with _lock:
+        # Another solve may have registered this problem in the meantime
+        nogoods = _learned.get(key, nogoods)
+        _keep(nogoods)
+        return nogoods.copy()
+
+
+def remember_nogoods(nogoods):
+    """Merge a copy from ``learned_nogoods`` back into the process's store; returns that store."""
+    with _lock:
+        shared = _learned.get((nogoods.fingerprint, nogoods.symmetric))
+        if shared is None:
+            shared = nogoods.copy()
+        else:
+            shared.merge(nogoods)
+        _keep(shared)
+        return shared
+
+
+def save_nogoods(nogoods, cache_dir):
+    """Write ``nogoods`` to ``cache_dir``, next to the catalog cache."""
+    with _lock:
+        data = pickle.dumps(nogoods, protocol=pickle.HIGHEST_PROTOCOL)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(cache_dir, nogoods.fingerprint, nogoods.symmetric)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
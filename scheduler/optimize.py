@@ -0,0 +1,187 @@
+"""Local search over the soft constraints of a feasible timetable.
+
+``optimize`` starts from a timetable that already satisfies the hard rules
+and runs simulated annealing over single-session moves: a move puts one
+session on another (day, slot, teacher) value of its domain, and is only
+considered when the ``Occupancy`` model says the new value fits. A moved
+session keeps its room when it is free at the new time, otherwise it takes
+the smallest suitable free room. The
+weighted objective is
+
+- ``gaps``: free slots between a group's first and last session of a day
+- ``balance``: the sum over groups and days of (sessions that day) squared
+- ``teacher_gaps``: idle slots between a teacher's sessions on a day
+- ``backup``: sessions handed to a backup teacher
+
+A move only touches the (group, day) and (teacher, day) rows of its old and
+new value, so its cost is evaluated on those rows alone, straight from the
+occupancy bitmasks. The search keeps the best timetable seen so far and
+returns it when the time limit is reached or ``stop`` is set.
+"""
+
+import math
+import random
+import time
+
+from scheduler.problem import Solution
+from scheduler.solver import CSPSolver
+
+DEFAULT_WEIGHTS = {"gaps": 3.0, "balance": 1.0, "teacher_gaps": 2.0, "backup": 10.0}
+DEFAULT_TIME_LIMIT = 5.0
+
+
+def _row_gaps(bits):
+    """Free slots strictly between the first and the last set bit."""
+    if not bits:
+        return 0
+    low = (bits & -bits).bit_length() - 1
+    return bits.bit_length() - low - bits.bit_count()
+
+
+class LocalSearch:
+    """Simulated annealing on top of a ``CSPSolver`` and a complete assignment."""
+
+    def __init__(self, solver, assignment, weights=None, seed=None, rooms=None):
+        self.solver = solver
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.rng = random.Random(seed)
+        self.moves = 0
+        self.accepted = 0
+
+        solver._reset_state()
+        self.occupancy = solver.occupancy
+        self.assignment = [None] * len(solver.variables)
+        for x, value in assignment.items():
+            var = solver.variables[x]
+            d, s, t, _ = value
+            self.occupancy.add(x, var.group_mask, t, d, s, var.lecture, var.length, var.rooms,
+                               (rooms or {}).get(x))
+            self.assignment[x] = value
+        # Only sessions with somewhere else to go are worth drawing
+        self.movable = [var for var in solver.variables
+                        if self.assignment[var.index] is not None and len(var.values) > 1]
+        self.row_mask = (1 << len(solver.time_slots)) - 1
+        self.cost = self.total_cost()
+
+    def _group_row(self, g, d):
+        bits = self.occupancy.group_busy[g] >> (d * self.occupancy.n_slots) & self.row_mask
+        n = bits.bit_count()
+        return self.weights["gaps"] * _row_gaps(bits) + self.weights["balance"] * n * n
+
+    def _teacher_row(self, t, d):
+        bits = self.occupancy.teacher_busy[t] >> (d * self.occupancy.n_slots) & self.row_mask
+        return self.weights["teacher_gaps"] * _row_gaps(bits)
+
+    def total_cost(self):
+        n_days = len(self.solver.days)
+        cost = sum(self._group_row(g, d) for g in range(len(self.solver.groups)) for d in range(n_days))
+        cost += sum(self._teacher_row(t, d) for t in range(len(self.solver.teachers)) for d in range(n_days))
+        cost += self.weights["backup"] * sum(1 for value in self.assignment if value and value[3])
+        return cost
+
+    def _rows_cost(self, group_ids, days, teacher_days):
+        cost = 0.0
+        for d in days:
+            for g in group_ids:
+                cost += self._group_row(g, d)
+        for t, d in teacher_days:
+            cost += self._teacher_row(t, d)
+        return cost
+
+    def try_move(self, var, value, temperature):
+        """Move ``var`` to ``value`` if it fits and the annealing rule accepts it."""
+        old = self.assignment[var.index]
+        if value == old:
+            return False
+        d, s, t, backup = old
+        nd, ns, nt, nbackup = value
+        occupancy = self.occupancy
+        days = (d,) if d == nd else (d, nd)
+        teacher_days = {(t, d), (nt, nd)}
+
+        before = self._rows_cost(var.group_ids, days, teacher_days)
+        room = occupancy.room_of(var.index)
+        occupancy.remove(var.group_mask, t, d, s, var.lecture, var.length, var.rooms)
+        if not occupancy.fits(var.group_mask, nt, nd, ns, var.lecture, var.length, var.rooms):
+            occupancy.add(var.index, var.group_mask, t, d, s, var.lecture, var.length, var.rooms, room)
+            return False
+        occupancy.add(var.index, var.group_mask, nt, nd, ns, var.lecture, var.length, var.rooms, room)
+        delta = self._rows_cost(var.group_ids, days, teacher_days) - before
+        delta += self.weights["backup"] * (nbackup - backup)
+
+        if delta <= 0 or (temperature > 0 and self.rng.random() < math.exp(-delta / temperature)):
+            self.assignment[var.index] = value
+            self.cost += delta
+            return True
+        occupancy.remove(var.group_mask, nt, nd, ns, var.lecture, var.length, var.rooms)
+        occupancy.add(var.index, var.group_mask, t, d, s, var.lecture, var.length, var.rooms, room)
+        return False
+
+    def run(self, time_limit=DEFAULT_TIME_LIMIT, start_temperature=None, end_temperature=0.05, stop=None):
+        """Anneal until ``time_limit`` seconds pass; return the best assignment as a dict.
+
+        The rooms of the best assignment are left in ``self.rooms``.
+        """
+        best_cost = self.cost
+        best = list(self.assignment)
+        self.rooms = dict(self.occupancy.owner_room)
+        if not self.movable:
+            return self._as_dict(best)
+        if start_temperature is None:
+            start_temperature = max(self.weights.values())
+        ratio = end_temperature / start_temperature
+
+        started = time.perf_counter()
+        temperature = start_temperature
+        rng = self.rng
+        while True:
+            if self.moves % 256 == 0:
+                elapsed = time.perf_counter() - started
+                if elapsed >= time_limit or (stop is not None and stop.is_set()):
+                    break
+                # Geometric cooling over the time budget
+                temperature = start_temperature * ratio ** (elapsed / time_limit)
+            self.moves += 1
+            var = rng.choice(self.movable)
+            if self.try_move(var, rng.choice(var.values), temperature):
+                self.accepted += 1
+                if self.cost < best_cost - 1e-9:
+                    best_cost = self.cost
+                    best = list(self.assignment)
+                    self.rooms = dict(self.occupancy.owner_room)
+        self.cost = best_cost
+        return self._as_dict(best)
+
+    @staticmethod
+    def _as_dict(assignment):
+        return {x: value for x, value in enumerate(assignment) if value is not None}
+
+
+def optimize(problem, schedules, weights=None, seed=None, time_limit=DEFAULT_TIME_LIMIT, stop=None):
+    """Improve ``schedules`` on the soft constraints and return a ``Solution``.
+
+    Every hard rule that holds in ``schedules`` still holds afterwards.
+    ``nodes`` counts the moves tried and ``backtracks`` the moves rejected.
+    """
+    started = time.perf_counter()
+    solver = CSPSolver(problem)
+    rooms = {}
+    assignment = solver.assignment_from_schedules(schedules, rooms)
+    search = LocalSearch(solver, assignment, weights=weights, seed=seed, rooms=rooms)
+    assignment = search.run(time_limit=time_limit, stop=stop)
+    unscheduled = solver.unscheduled(assignment)
+    return Solution(
+        schedules=solver.to_schedules(assignment, search.rooms),
+        complete=not unscheduled,
+        unscheduled=unscheduled,
+        seed=seed,
+        nodes=search.moves,
+        backtracks=search.moves - search.accepted,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+def soft_cost(problem, schedules, weights=None):
+    """Weighted soft-constraint cost of ``schedules`` (lower is better)."""
+    solver = CSPSolver(problem)
+    return LocalSearch(solver, solver.assignment_from_schedules(schedules), weights=weights).cost
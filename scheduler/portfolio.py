@@ -0,0 +1,79 @@
+"""Portfolio search: independently seeded solver runs on a process pool.
+
+The first complete timetable wins and the other runs are told to stop. If
+nothing completes before the deadline, the best partial timetable (the one
+with the fewest unscheduled sessions) is returned.
+"""
+
+import dataclasses
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from scheduler.solver import DEFAULT_MAX_NODES, solve
+
+# Set in each worker by _init_worker
+_stop = None
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def _run(problem, seed, max_nodes, time_limit):
+    return solve(problem, seed=seed, max_nodes=max_nodes, time_limit=time_limit, stop=_stop)
+
+
+def score(solution):
+    """Higher is better: complete first, then fewest unscheduled sessions."""
+    return (solution.complete, -len(solution.unscheduled))
+
+
+def portfolio_seeds(runs, seed=None):
+    """Seeds for ``runs`` runs; without a base seed the first run is the deterministic one."""
+    if seed is not None:
+        return [seed + i for i in range(runs)]
+    return [None] + list(range(1, runs))
+
+
+def solve_portfolio(problem, runs=None, workers=None, seed=None, time_limit=60.0,
+                    max_nodes=DEFAULT_MAX_NODES):
+    """Run ``runs`` seeded searches on ``workers`` processes and return the best ``Solution``."""
+    runs = runs or os.cpu_count() or 1
+    workers = min(workers or os.cpu_count() or 1, runs)
+    deadline = time.perf_counter() + time_limit
+
+    stop = multiprocessing.Event()
+    best = None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop,)) as executor:
+        pending = {
+            executor.submit(_run, problem, run_seed, max_nodes, time_limit)
+            for run_seed in portfolio_seeds(runs, seed)
+        }
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Out of time: runs that never started are dropped, running
+                # ones stop at their next check and hand back their best
+                # partial timetable
+                stop.set()
+                pending = {future for future in pending if not future.cancel()}
+                remaining = None
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                solution = future.result()
+                if best is None or score(solution) > score(best):
+                    best = solution
+            if best is not None and best.complete:
+                stop.set()
+                for future in pending:
+                    future.cancel()
+                break
+    if best is not None and best.limit == "stop":
+        # The runs were stopped by the portfolio's own deadline
+        best = dataclasses.replace(best, limit="time")
+    return best
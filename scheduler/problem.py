@@ -0,0 +1,167 @@
+"""Typed problem and solution objects for the scheduling engine.
+
+Nothing here depends on Streamlit or pandas, so the engine can run from the
+command line, a batch job or a worker process.
+"""
+
+import copy
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Union
+
+from scheduler import catalog
+from scheduler.session import UNAVAILABLE, Session
+from scheduler.storage import schedules_to_json
+
+# A nested {group: {day: {slot_label: Session, None or UNAVAILABLE}}} timetable
+Schedules = Dict[str, Dict[str, Dict[str, Union[Session, str, None]]]]
+
+
+# Check if a time slot is available
+def is_slot_available(day, slot_index):
+    # No classes on Tuesday afternoon
+    if day == "Tuesday" and slot_index >= 3:  # After 13:00
+        return False
+    return True
+
+
+@dataclass
+class Problem:
+    """Everything the solver needs to build a timetable."""
+
+    groups: List[str] = field(default_factory=lambda: list(catalog.DEFAULT_GROUPS))
+    days: List[str] = field(default_factory=lambda: list(catalog.DAYS))
+    time_slots: List[dict] = field(default_factory=lambda: copy.deepcopy(catalog.TIME_SLOTS))
+    courses: Dict[str, dict] = field(default_factory=lambda: copy.deepcopy(catalog.COURSES))
+    additional_teachers: Dict[str, Dict[str, List[str]]] = field(
+        default_factory=lambda: copy.deepcopy(catalog.ADDITIONAL_TEACHERS))
+    # {course: [teachers]}, or {course: {component: [teachers]}} for backups by component
+    backup_teachers: Dict[str, Union[List[str], Dict[str, List[str]]]] = field(
+        default_factory=lambda: copy.deepcopy(catalog.BACKUP_TEACHERS))
+    component_backup_teachers: Dict[str, List[str]] = field(
+        default_factory=lambda: copy.deepcopy(catalog.COMPONENT_BACKUP_TEACHERS))
+    # {teacher: {day: [slot labels]}} a teacher cannot take
+    teacher_unavailable: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    rooms: List[dict] = field(default_factory=lambda: copy.deepcopy(catalog.ROOMS))
+    group_sizes: Dict[str, int] = field(default_factory=dict)
+    # {course: [groups]} that take a course; courses not listed are taken by every group
+    course_groups: Dict[str, List[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a problem from a catalog dict; missing keys use the built-in catalog."""
+        known = {name for name in cls.__dataclass_fields__}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown catalog keys: {', '.join(sorted(unknown))}")
+        return cls(**copy.deepcopy(data))
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return asdict(self)
+
+    def fingerprint(self):
+        """Content hash of the problem; equal problems share compiled models and store entries."""
+        data = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+    @property
+    def slot_labels(self):
+        return [slot["label"] for slot in self.time_slots]
+
+    def open_slots(self):
+        """(day index, slot index) pairs where sessions may be placed."""
+        return [
+            (d, s)
+            for d, day in enumerate(self.days)
+            for s, slot in enumerate(self.time_slots)
+            if is_slot_available(day, s) and day not in slot.get("unavailable", [])
+        ]
+
+    def group_size(self, group):
+        return self.group_sizes.get(group, catalog.DEFAULT_GROUP_SIZE)
+
+    def groups_of(self, course):
+        """Groups that take ``course``, in catalog order."""
+        if course not in self.course_groups:
+            return list(self.groups)
+        taking = set(self.course_groups[course])
+        return [group for group in self.groups if group in taking]
+
+    def block_teacher(self, teacher, day, slot_labels=None):
+        """Mark ``teacher`` unavailable on ``day`` for ``slot_labels`` (default: the whole day)."""
+        blocked = self.teacher_unavailable.setdefault(teacher, {}).setdefault(day, [])
+        for label in slot_labels if slot_labels is not None else self.slot_labels:
+            if label not in blocked:
+                blocked.append(label)
+
+    def teacher_blocked(self, teacher):
+        """(day index, slot index) pairs ``teacher`` cannot take."""
+        days = self.teacher_unavailable.get(teacher, {})
+        return {
+            (d, s)
+            for d, day in enumerate(self.days)
+            for s, label in enumerate(self.slot_labels)
+            if label in days.get(day, ())
+        }
+
+    def empty_schedules(self):
+        """Schedules with every open slot set to None and the rest UNAVAILABLE."""
+        open_slots = set(self.open_slots())
+        return {
+            group: {
+                day: {
+                    label: None if (d, s) in open_slots else UNAVAILABLE
+                    for s, label in enumerate(self.slot_labels)
+                }
+                for d, day in enumerate(self.days)
+            }
+            for group in self.groups
+        }
+
+
+@dataclass
+class Solution:
+    """Result of one solver run."""
+
+    schedules: Schedules
+    complete: bool
+    unscheduled: List[str] = field(default_factory=list)
+    seed: Optional[int] = None
+    nodes: int = 0
+    backtracks: int = 0
+    elapsed: float = 0.0
+    # True when the engine proved that no complete timetable exists
+    infeasible: bool = False
+    # What cut an incomplete search short: "nodes", "time" or "stop"
+    limit: Optional[str] = None
+    # Sessions that left their previous slot or teacher (repairs only)
+    moved: int = 0
+    # What the engine did: counters, phase timings, profile (``Trace.to_dict``)
+    trace: Optional[dict] = None
+
+    def to_dict(self):
+        data = asdict(self)
+        data["schedules"] = schedules_to_json(self.schedules)
+        return data
+
+
+@dataclass
+class Progress:
+    """Where a running solve stands, as handed to an engine's ``progress`` callback."""
+
+    engine: str
+    # Sessions to place in all
+    total: int
+    # Sessions in the current partial timetable, and the most placed at once so far
+    placed: int = 0
+    best: int = 0
+    nodes: int = 0
+    backtracks: int = 0
+    restarts: int = 0
+    elapsed: float = 0.0
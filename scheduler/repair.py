@@ -0,0 +1,129 @@
+"""Repair an existing timetable after the problem changed.
+
+When a teacher becomes unavailable, a group is added, a course is dropped or
+a time slot closes, ``repair`` keeps every session of the old timetable that
+still fits the new problem and only re-solves around the ones that do not:
+
+1. sessions whose old value is still in their domain and still consistent
+   with the sessions kept so far stay where they are
+2. the others, plus sessions that did not exist before, are "affected"
+3. the CSP search runs with everything outside the neighbourhood of the
+   affected sessions pinned to its old value; freed sessions try their old
+   value first
+4. if that fails the neighbourhood grows by one ring of sessions sharing a
+   group or a teacher, first on the same day, then on any day, up to a
+   full re-solve
+
+so only the sessions that have to move do, and most repairs touch a small
+corner of the timetable.
+"""
+
+import time
+
+from scheduler.problem import Solution
+from scheduler.solver import DEFAULT_MAX_NODES, CSPSolver
+from scheduler.trace import Trace
+
+
+def _kept(solver, previous, rooms):
+    """The part of ``previous`` that is still valid under the new problem.
+
+    Kept sessions hold on to their previous room while it is still free.
+    """
+    solver._reset_state()
+    occupancy = solver.occupancy
+    kept = {}
+    for x in sorted(previous):
+        var = solver.variables[x]
+        value = previous[x]
+        d, s, t, _ = value
+        if value in var.values and occupancy.fits(var.group_mask, t, d, s, var.lecture, var.length, var.rooms):
+            occupancy.add(x, var.group_mask, t, d, s, var.lecture, var.length, var.rooms, rooms.get(x))
+            kept[x] = value
+    return kept
+
+
+def _same_day_neighbours(solver, previous):
+    """Clash neighbours whose previous values fall on the same day.
+
+    Shared lectures touch every group, so the plain neighbour lists of the
+    model would already cover most of the timetable in the first ring.
+    """
+    neighbours = [set() for _ in solver.variables]
+    for x, others in enumerate(solver.model.neighbours):
+        day = previous[x][0] if x in previous else None
+        for y in others:
+            if day is None or y not in previous or previous[y][0] == day:
+                neighbours[x].add(y)
+    return neighbours
+
+
+def repair(problem, schedules, seed=None, max_nodes=DEFAULT_MAX_NODES, time_limit=None, stop=None, profile=None):
+    """Re-solve ``schedules`` for the updated ``problem`` while moving as few sessions as possible.
+
+    Returns a ``Solution`` whose ``moved`` field counts the sessions that
+    changed slot or teacher; sessions of dropped courses or groups simply
+    disappear. ``max_nodes`` applies to each round of the search and
+    ``time_limit`` to the whole repair. The trace adds up every round.
+    """
+    started = time.perf_counter()
+    trace = Trace("repair")
+    with trace.profiled(profile):
+        solution = _repair(problem, schedules, seed, max_nodes, time_limit, stop, trace, started)
+    solution.trace = trace.to_dict()
+    return solution
+
+
+def _repair(problem, schedules, seed, max_nodes, time_limit, stop, trace, started):
+    solver = CSPSolver(problem, seed=seed, max_nodes=max_nodes, stop=stop, trace=trace)
+    rooms = {}
+    previous = solver.assignment_from_schedules(schedules, rooms)
+    kept = _kept(solver, previous, rooms)
+    solver.room_assignment = dict(solver.occupancy.owner_room)
+    free = {var.index for var in solver.variables} - set(kept)
+    solver.preferred = dict(previous)
+    solver.preferred_rooms = rooms
+
+    rings = [True, True, False, False]
+    nodes = backtracks = 0
+    assignment = dict(kept)
+    complete = not free
+    infeasible = False
+    while free:
+        solver.fixed = {x: value for x, value in kept.items() if x not in free}
+        if time_limit is not None:
+            solver.time_limit = max(0.0, time_limit - (time.perf_counter() - started))
+        result, complete = solver.solve()
+        nodes += solver.nodes
+        backtracks += solver.backtracks
+        if complete or len(result) > len(assignment):
+            assignment = result
+        if complete or len(free) == len(solver.variables):
+            infeasible = solver.infeasible
+            break
+        if (solver.time_limit is not None and solver.time_limit <= 0) or (stop is not None and stop.is_set()):
+            break
+        # Free the next ring of sessions around the ones still in question:
+        # same-day neighbours first, then any neighbours, then everything
+        ring = set()
+        while not ring and rings:
+            same_day = rings.pop(0)
+            neighbours = _same_day_neighbours(solver, previous) if same_day else solver.model.neighbours
+            ring = {y for x in free for y in neighbours[x]} - free
+        free |= ring if ring else {var.index for var in solver.variables}
+
+    with trace.phase("render"):
+        schedules = solver.to_schedules(assignment)
+    trace.count("moved", sum(1 for x, value in previous.items() if x in assignment and assignment[x] != value))
+    return Solution(
+        schedules=schedules,
+        complete=complete,
+        unscheduled=solver.unscheduled(assignment),
+        seed=seed,
+        nodes=nodes,
+        backtracks=backtracks,
+        elapsed=time.perf_counter() - started,
+        infeasible=infeasible,
+        limit=None if complete else solver.limit,
+        moved=trace.counters["moved"],
+    )
@@ -0,0 +1,97 @@
+"""Structured session records.
+
+Timetable cells hold a ``Session`` (or None for a free slot, or the
+``UNAVAILABLE`` marker). Labels such as "rx2 td (Mr. Sahli) (backup) [Lab 2]"
+are only built when something is displayed or exported.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+UNAVAILABLE = "UNAVAILABLE"
+BREAK = "BREAK"
+
+
+class Session(NamedTuple):
+    """One placed session. ``group`` is None for a lecture shared by all groups."""
+
+    course: str
+    component: str
+    teacher: str
+    group: Optional[str] = None
+    backup: bool = False
+    room: Optional[str] = None
+
+    @property
+    def shared(self):
+        return self.group is None
+
+    @property
+    def is_lecture(self):
+        return self.component == "cours"
+
+    def label(self):
+        label = f"{self.course} {self.component} ({self.teacher})"
+        if self.shared:
+            label += " (ALL)"
+        elif self.backup:
+            label += " (backup)"
+        if self.room is not None:
+            label += f" [{self.room}]"
+        return label
+
+    def to_dict(self):
+        data = {"course": self.course, "component": self.component, "teacher": self.teacher}
+        if self.group is not None:
+            data["group"] = self.group
+        if self.backup:
+            data["backup"] = True
+        if self.room is not None:
+            data["room"] = self.room
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["course"], data["component"], data["teacher"], data.get("group"), data.get("backup", False),
+                   data.get("room"))
+
+
+@lru_cache(maxsize=None)
+def _parse_label(label, group):
+    parts = label.split()
+    if len(parts) < 2:
+        return None
+    teacher = None
+    for part in label.split("(")[1:]:
+        if ")" in part and not part.strip().startswith("ALL") and not part.strip().startswith("Group"):
+            teacher = part.split(")")[0].strip()
+            break
+    if teacher is None:
+        return None
+    shared = "(ALL)" in label
+    return Session(parts[0], parts[1], teacher, None if shared else group, "(backup)" in label)
+
+
+def to_cell(value, group=None):
+    """Normalize a stored cell (Session, dict, legacy label string or None) to a cell value."""
+    if value is None or isinstance(value, Session):
+        return value
+    if isinstance(value, dict):
+        return Session.from_dict(value)
+    if isinstance(value, (list, tuple)):
+        return Session(*value)
+    if value in (UNAVAILABLE, BREAK):
+        return value
+    return _parse_label(value, group)
+
+
+def cell_session(value):
+    """The Session in a cell, or None for free, unavailable and break cells."""
+    return value if isinstance(value, Session) else None
+
+
+def cell_label(value):
+    """Display label for a cell."""
+    if isinstance(value, Session):
+        return value.label()
+    return value or ""
@@ -0,0 +1,1027 @@
+"""Constraint satisfaction engine for the group timetables.
+
+Every session that has to be placed is a CSP variable:
+
+- one variable per shared lecture ("cours"), covering all groups at once
+- one variable per group for every separate component (td, tp, ...)
+
+and as many of them as the component has sessions per week (``per_week``).
+A session lasts one slot unless the catalog gives it ``slots`` (or
+``hours``), in which case it needs that many contiguous slots.
+
+A value is a (day, slot, teacher) triple, the slot being the first one of
+the block. Separate sessions can fall back on the component backup teachers,
+those values are always tried last. When the problem lists rooms, a value
+only fits if a room of the right type and capacity is free for the whole
+block, moving sessions already placed to other rooms if need be; the room
+itself is picked when the value is assigned.
+
+The search runs AC-3 once, then a depth-first search using MRV variable
+ordering, LCV value ordering, forward checking and conflict-directed
+backjumping (FC-CBJ), breaking the symmetries between interchangeable
+groups and backup teachers (see ``scheduler.symmetry``). Every dead end
+leaves a nogood behind and the search restarts on a Luby schedule, keeping
+its nogoods and conflict weights (see ``scheduler.nogoods``) and breaking
+value ties another way; ``solve`` carries them over to the next solve of
+the same problem. With no seed the run is fully deterministic for what it
+has learned so far: restart ``n`` breaks ties with a generator seeded by
+``n``.
+Each solver records what its runs did in a ``Trace`` (see
+``scheduler.trace``); ``solve`` returns it as ``Solution.trace``.
+"""
+
+import math
+import random
+import time
+
+from scheduler.catalog import ROOM_TYPES
+from scheduler.matching import assign_teachers
+from scheduler.nogoods import Nogoods, learned_nogoods, remember_nogoods, save_nogoods, session_key
+from scheduler.problem import Progress, Solution
+from scheduler.session import Session, cell_session
+from scheduler.state import CHECK_NAMES, FITS, Occupancy
+from scheduler.symmetry import group_classes, lex_chains, teacher_classes
+from scheduler.trace import Trace
+
+MAX_TEACHING_DAYS = 2
+MAX_LECTURES_PER_DAY = 2
+MAX_CONSECUTIVE_SESSIONS = 3
+DEFAULT_MAX_NODES = 200000
+# Seconds of search the command line and the app allow by default
+DEFAULT_TIME_LIMIT = 60.0
+# Dead ends per unit of the Luby restart schedule
+RESTART_UNIT = 30
+# Nodes between two checks of the deadline, stop and progress of a search
+CHECK_NODES = 32
+# Seconds between two progress reports of a search
+PROGRESS_INTERVAL = 0.2
+# Length of one time slot, to turn a component's "hours" into slots
+SLOT_MINUTES = 90
+
+
+class Variable:
+    """A session to place: which groups attend it and who may teach it."""
+
+    def __init__(self, index, course, component, groups, teacher, shared, length=1, occurrence=0, room_type=None):
+        self.index = index
+        self.course = course
+        self.component = component
+        self.groups = groups
+        self.teacher = teacher
+        self.shared = shared
+        self.length = length          # contiguous slots
+        self.occurrence = occurrence  # which of the component's weekly sessions
+        self.room_type = room_type
+        self.rooms = None             # bitmask of suitable rooms, None when rooms are not modelled
+        self.room_reach = 0           # rooms its placement can move other sessions through
+        self.is_lecture = component == "cours"
+        self.backups = []
+        self.values = []
+
+    def session(self, teacher, backup, room=None):
+        group = None if self.shared else self.groups[0]
+        return Session(self.course, self.component, teacher, group, backup, room)
+
+    def __repr__(self):
+        return f"Variable({self.course} {self.component} {', '.join(self.groups)})"
+
+
+def session_shape(entry):
+    """(slots per session, sessions per week) of a catalog teacher entry."""
+    length = entry.get("slots")
+    if length is None:
+        length = math.ceil(entry["hours"] * 60 / SLOT_MINUTES) if "hours" in entry else 1
+    return max(1, int(length)), max(1, int(entry.get("per_week", 1)))
+
+
+def build_variables(groups, courses, additional_teachers, component_backup_teachers, backup_teachers=None,
+                    course_groups=None):
+    """Turn the course catalog into CSP variables (without domains).
+
+    ``course_groups`` maps a course to the groups that take it (default:
+    every group); ``backup_teachers`` maps a course to a list of backups, or
+    to one list per component.
+    """
+    variables = []
+    course_groups = course_groups or {}
+
+    def add(course, component, var_groups, teacher, shared, entry):
+        length, per_week = session_shape(entry)
+        room_type = entry.get("room_type", ROOM_TYPES.get(component))
+        for occurrence in range(per_week):
+            variables.append(Variable(len(variables), course, component, var_groups, teacher, shared,
+                                      length, occurrence, room_type))
+
+    for course_name, components in courses.items():
+        taking = set(course_groups.get(course_name, groups))
+        attending = [group for group in groups if group in taking]
+        for component_name, details in components.items():
+            # Check if details is a dict (single teacher) or list (multiple teachers)
+            entries = details if isinstance(details, list) else [details]
+
+            # Shared sessions are attended by every group of the course together
+            for teacher_info in entries:
+                if teacher_info.get("shared", False) and attending:
+                    add(course_name, component_name, attending, teacher_info["teacher"], True, teacher_info)
+
+            separate = [t for t in entries if not t.get("shared", False)]
+            if not separate:
+                continue
+            teachers = [t["teacher"] for t in separate]
+            if isinstance(details, dict) and component_name in additional_teachers.get(course_name, {}):
+                teachers = additional_teachers[course_name][component_name]
+
+            # One separate session per group, teachers assigned round-robin
+            for i, group in enumerate(attending):
+                add(course_name, component_name, [group], teachers[i % len(teachers)], False, separate[0])
+
+    # Backups: the course's own backup teachers first, then the component's
+    backup_teachers = backup_teachers or {}
+    for var in variables:
+        if not var.shared:
+            course_backups = backup_teachers.get(var.course, [])
+            if isinstance(course_backups, dict):
+                course_backups = course_backups.get(var.component, [])
+            candidates = course_backups + component_backup_teachers.get(var.component, [])
+            var.backups = [t for t in dict.fromkeys(candidates) if t != var.teacher]
+    return variables
+
+
+class Model:
+    """A problem compiled for the search: variables with their domains.
+
+    Teachers, groups and courses are interned to integers, every variable
+    knows its values split by day and by teacher, and ``neighbours`` lists
+    for each variable the ones it can clash with (shared group or teacher).
+    Nothing in here changes during a search, so one model can serve any
+    number of solver runs on the same problem.
+    """
+
+    def __init__(self, problem):
+        self.fingerprint = problem.fingerprint()
+        self.variables = build_variables(
+            problem.groups, problem.courses, problem.additional_teachers, problem.component_backup_teachers,
+            problem.backup_teachers, problem.course_groups,
+        )
+
+        # Integer ids for groups, teachers and courses
+        group_index = {group: g for g, group in enumerate(problem.groups)}
+        self.teachers = []
+        self.teacher_index = {}
+        course_index = {}
+        for var in self.variables:
+            var.group_ids = [group_index[group] for group in var.groups]
+            var.group_mask = sum(1 << g for g in var.group_ids)
+            var.lecture = course_index.setdefault(var.course, len(course_index)) if var.is_lecture else None
+            var.teacher_ids = [self._intern_teacher(t) for t in [var.teacher] + var.backups]
+
+        # Rooms, smallest first so the lowest free bit is the tightest fit;
+        # a variable with no suitable room gets an empty domain
+        self.rooms = sorted(problem.rooms, key=lambda room: (room.get("capacity") is None, room.get("capacity") or 0))
+        self.room_index = {room["name"]: r for r, room in enumerate(self.rooms)}
+        if self.rooms:
+            for var in self.variables:
+                size = sum(problem.group_size(group) for group in var.groups)
+                var.rooms = sum(
+                    1 << r for r, room in enumerate(self.rooms)
+                    if room.get("type") in (None, var.room_type)
+                    and (room.get("capacity") is None or room["capacity"] >= size)
+                )
+        # Rooms linked by sessions that could use either: placing a session
+        # may move others to any room of its component. Moving sessions
+        # between rooms only shares them out exactly when no session spans
+        # several slots (see ``scheduler.state``)
+        components = []
+        for var in self.variables:
+            if var.rooms:
+                merged = var.rooms
+                for component in components:
+                    if component & merged:
+                        merged |= component
+                components = [component for component in components if not component & merged] + [merged]
+        for var in self.variables:
+            if var.rooms:
+                var.room_reach = next(component for component in components if component & var.rooms)
+        self.rooms_exact = all(var.length == 1 for var in self.variables if var.rooms)
+
+        # Unary constraints: blocked slots never enter a domain, and a block
+        # only starts where its whole run of slots is open
+        self.open_slots = problem.open_slots()
+        open_cells = set(self.open_slots)
+        n_slots = len(problem.time_slots)
+        blocked = [problem.teacher_blocked(teacher) for teacher in self.teachers]
+        for var in self.variables:
+            starts = [
+                (d, s) for d, s in self.open_slots
+                if s + var.length <= n_slots and all((d, s + j) in open_cells for j in range(1, var.length))
+            ]
+            var.cells = (1 << var.length) - 1  # the block as a bitmask, shifted to its first cell
+            # Values are (day, slot, teacher, backup); primary teacher first
+            var.values = [
+                (d, s, t, i > 0)
+                for i, t in enumerate(var.teacher_ids)
+                for d, s in starts
+                if all((d, s + j) not in blocked[t] for j in range(var.length))
+            ] if var.rooms != 0 else []
+            var.by_day = [[] for _ in problem.days]
+            var.by_teacher = {}
+            for k, (d, s, t, _) in enumerate(var.values):
+                var.by_day[d].append(k)
+                var.by_teacher.setdefault(t, []).append(k)
+
+        # Binary clash constraints: variables sharing a group or a teacher
+        self.neighbours = [[] for _ in self.variables]
+        by_teacher = {}
+        for var in self.variables:
+            for t in var.teacher_ids:
+                by_teacher.setdefault(t, 0)
+                by_teacher[t] |= 1 << var.index
+        for var in self.variables:
+            mask = 0
+            for t in var.teacher_ids:
+                mask |= by_teacher[t]
+            for other in self.variables[var.index + 1:]:
+                if var.group_mask & other.group_mask or mask >> other.index & 1:
+                    self.neighbours[var.index].append(other.index)
+                    self.neighbours[other.index].append(var.index)
+
+        # Symmetries: twin sessions of interchangeable groups are ordered
+        # along their class (True: the other one comes after), and
+        # interchangeable backup teachers are opened in id order
+        self.group_classes = group_classes(self.variables, problem)
+        self.lex_neighbours = [[] for _ in self.variables]
+        for chain in lex_chains(self.variables, self.group_classes):
+            for x, y in zip(chain, chain[1:]):
+                self.lex_neighbours[x].append((y, True))
+                self.lex_neighbours[y].append((x, False))
+        self.teacher_classes = teacher_classes(self.variables, blocked)
+
+    def _intern_teacher(self, name):
+        if name not in self.teacher_index:
+            self.teacher_index[name] = len(self.teachers)
+            self.teachers.append(name)
+        return self.teacher_index[name]
+
+
+# Recently compiled models by problem fingerprint
+_models = {}
+MODEL_CACHE_SIZE = 8
+
+
+def compile_problem(problem):
+    """The compiled ``Model`` of ``problem``, reused while its content is unchanged."""
+    fingerprint = problem.fingerprint()
+    model = _models.pop(fingerprint, None)
+    if model is None:
+        model = Model(problem)
+    remember_model(model)
+    return model
+
+
+def remember_model(model):
+    """Put an already compiled (e.g. unpickled) model in the in-process cache."""
+    _models[model.fingerprint] = model
+    while len(_models) > MODEL_CACHE_SIZE:
+        del _models[next(iter(_models))]
+
+
+def luby(i):
+    """The ``i``-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if (1 << k) - 1 == i:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class CSPSolver:
+    """FC-CBJ search over the timetable variables.
+
+    The static part of the problem comes from a compiled ``Model``; the
+    search state lives in an ``Occupancy`` bitset model, so values are plain
+    ``(day, slot, teacher_id, backup)`` tuples.
+    """
+
+    def __init__(self, problem, seed=None, max_nodes=DEFAULT_MAX_NODES, time_limit=None, stop=None, trace=None,
+                 progress=None):
+        self.problem = problem
+        self.groups = list(problem.groups)
+        self.days = list(problem.days)
+        self.time_slots = list(problem.time_slots)
+        self.slot_labels = problem.slot_labels
+        self.seed = seed
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.stop = stop  # any object with is_set(), e.g. a threading/multiprocessing Event
+        self.progress = progress  # called with a Progress every PROGRESS_INTERVAL seconds of search
+        self.rng = random.Random(seed) if seed is not None else None
+        # Breaks LCV ties: the seeded generator, or none (value order) until
+        # a restart, from which one seeded by the restart count takes over
+        self.tie_rng = self.rng
+        self.trace = trace if trace is not None else Trace("csp")
+        with self.trace.phase("compile"):
+            self.model = compile_problem(problem)
+        self.variables = self.model.variables
+        self.teachers = self.model.teachers
+        self.teacher_index = self.model.teacher_index
+        self.open_slots = self.model.open_slots
+        self.nodes = 0
+        self.backtracks = 0
+        self.infeasible = False
+        # Limit that ended the last search early: "nodes", "time" or "stop"
+        self.limit = None
+        # Prune timetables that only swap interchangeable groups or teachers;
+        # off whenever values are pinned or preferred, which are not symmetric
+        self.break_symmetry = True
+        self.symmetric = False
+        # Variables pinned to one value, and values (and rooms) to try first
+        self.fixed = {}
+        self.preferred = {}
+        self.preferred_rooms = {}
+        # Room index of every variable in the returned assignment
+        self.room_assignment = {}
+        # Forward-checking outcomes by check kind, nodes by component and
+        # nodes on backup teachers, flushed into the trace after each solve
+        self.check_counts = [0] * (max(CHECK_NAMES) + 1)
+        self.component_nodes = {}
+        self.backup_nodes = 0
+        self.symmetry_pruned = 0
+        # Nogoods and weights learned by earlier solves (see
+        # scheduler.nogoods), None to start from scratch every solve; and
+        # restarts after restart_unit times the next Luby number of dead
+        # ends, None to never restart
+        self.learned = None
+        self.nogoods = Nogoods(self.model.fingerprint)
+        self.weights = [0] * len(self.variables)
+        self.restart_unit = RESTART_UNIT
+        self.restarts = 0
+        self.nogoods_learned = 0
+        self.nogood_pruned = 0
+
+    # ------------------------------------------------------------------
+    # Search state
+    # ------------------------------------------------------------------
+
+    def _reset_state(self):
+        n = len(self.variables)
+        self.assignment = [None] * n
+        self.value_index = [None] * n
+        self.order = []
+        self.removed = [[None] * len(var.values) for var in self.variables]
+        self.size = [len(var.values) for var in self.variables]
+        self.pruned_log = [[] for _ in range(n)]
+        self.conf = [set() for _ in range(n)]
+        self.occupancy = Occupancy(
+            len(self.groups), len(self.teachers), len(self.days), len(self.time_slots),
+            max_teaching_days=MAX_TEACHING_DAYS,
+            max_lectures_per_day=MAX_LECTURES_PER_DAY,
+            max_consecutive=MAX_CONSECUTIVE_SESSIONS,
+        )
+
+    def _init_loads(self):
+        """Count live future values per group cell, teacher cell and teacher day."""
+        n_cells = len(self.days) * len(self.time_slots)
+        self.group_load = [0] * (len(self.groups) * n_cells)
+        self.teacher_load = [0] * (len(self.teachers) * n_cells)
+        self.teacher_day_load = [0] * (len(self.teachers) * len(self.days))
+        for var in self.variables:
+            removed = self.removed[var.index]
+            for k in range(len(var.values)):
+                if removed[k] is None:
+                    self._count(var, k, 1)
+
+    def _count(self, var, k, delta):
+        d, s, t, _ = var.values[k]
+        n_slots = len(self.time_slots)
+        n_cells = len(self.days) * n_slots
+        first = d * n_slots + s
+        for cell in range(first, first + var.length):
+            for g in var.group_ids:
+                self.group_load[g * n_cells + cell] += delta
+            self.teacher_load[t * n_cells + cell] += delta
+        self.teacher_day_load[t * len(self.days) + d] += delta
+
+    def conflicts(self, var, value):
+        """Return the assigned variables that rule out ``value``, or None if it fits."""
+        d, s, t, _ = value
+        kind = self.occupancy.check(var.group_mask, t, d, s, var.lecture, var.length, var.rooms)
+        if kind == FITS:
+            return None
+        return self.occupancy.blame(kind, var.group_mask, t, d, s, var.lecture, var.length, var.rooms)
+
+    def _assign(self, var, k):
+        value = var.values[k]
+        d, s, t, _ = value
+        self.assignment[var.index] = value
+        self.value_index[var.index] = k
+        self.order.append(var.index)
+        self.component_nodes[var.component] = self.component_nodes.get(var.component, 0) + 1
+        if value[3]:
+            self.backup_nodes += 1
+        self.occupancy.add(var.index, var.group_mask, t, d, s, var.lecture, var.length, var.rooms,
+                           self.preferred_rooms.get(var.index))
+        # The variable leaves the future: its values stop counting for LCV
+        removed = self.removed[var.index]
+        for k in range(len(var.values)):
+            if removed[k] is None:
+                self._count(var, k, -1)
+
+    def _unassign(self, var):
+        d, s, t, _ = self.assignment[var.index]
+        x = var.index
+        self.occupancy.remove(var.group_mask, t, d, s, var.lecture, var.length, var.rooms)
+
+        # Restore the values this variable pruned from the future
+        for y, k in self.pruned_log[x]:
+            self.removed[y][k] = None
+            self.size[y] += 1
+            self._count(self.variables[y], k, 1)
+        self.pruned_log[x] = []
+        self.assignment[x] = None
+        self.value_index[x] = None
+        self.order.pop()
+        removed = self.removed[x]
+        for k in range(len(var.values)):
+            if removed[k] is None:
+                self._count(var, k, 1)
+
+    def _forward_check(self, var):
+        """Prune future values inconsistent with ``var``; return a wiped-out variable or None."""
+        x = var.index
+        d, _, t, _ = self.assignment[x]
+        log = self.pruned_log[x]
+        check = self.occupancy.check
+        check_counts = self.check_counts
+
+        for other in self.variables:
+            y = other.index
+            if self.assignment[y] is not None:
+                continue
+            shares_group = var.group_mask & other.group_mask
+            # Only values on the same day (same groups or rooms this
+            # assignment may have moved sessions through) or with the same
+            # teacher can have been affected by this assignment
+            same_day = shares_group or (other.rooms or 0) & var.room_reach
+            candidates = other.by_day[d] if same_day else []
+            same_teacher = other.by_teacher.get(t)
+            if same_teacher:
+                candidates = candidates + [k for k in same_teacher if not same_day or other.values[k][0] != d]
+            removed = self.removed[y]
+            for k in candidates:
+                if removed[k] is not None:
+                    continue
+                vd, vs, vt, _ = other.values[k]
+                kind = check(other.group_mask, vt, vd, vs, other.lecture, other.length, other.rooms)
+                check_counts[kind] += 1
+                if kind != FITS:
+                    reason = self.occupancy.blame(kind, other.group_mask, vt, vd, vs, other.lecture, other.length, other.rooms)
+                    reason.add(x)
+                    removed[k] = reason
+                    log.append((y, k))
+                    self.size[y] -= 1
+                    self._count(other, k, -1)
+            if self.size[y] == 0:
+                return other
+
+        if self.symmetric:
+            # Twin sessions of interchangeable groups stay in increasing order
+            mine = self.assignment[x][:3]
+            for y, after in self.model.lex_neighbours[x]:
+                if self.assignment[y] is not None:
+                    continue
+                other = self.variables[y]
+                removed = self.removed[y]
+                for k, value in enumerate(other.values):
+                    if removed[k] is None and (value[:3] <= mine if after else value[:3] >= mine):
+                        removed[k] = {x}
+                        log.append((y, k))
+                        self.size[y] -= 1
+                        self._count(other, k, -1)
+                        self.symmetry_pruned += 1
+                if self.size[y] == 0:
+                    return other
+
+        # Learned nogoods: once all their literals but one hold, the last
+        # one's value goes, blamed on the others
+        for nogood in self.nogoods.units_after((x, self.value_index[x]), self.value_index):
+            y, j = nogood[1]
+            if self.assignment[y] is not None or self.removed[y][j] is not None:
+                continue
+            self.removed[y][j] = {z for z, _ in nogood if z != y}
+            log.append((y, j))
+            self.size[y] -= 1
+            self._count(self.variables[y], j, -1)
+            self.nogood_pruned += 1
+            if self.size[y] == 0:
+                return self.variables[y]
+        return None
+
+    def _restrict(self, var, value):
+        """Permanently cut the domain of ``var`` down to ``value``."""
+        removed = self.removed[var.index]
+        for k, other in enumerate(var.values):
+            if other != value and removed[k] is None:
+                removed[k] = set()
+                self.size[var.index] -= 1
+
+    def _explain(self, var):
+        """Past variables responsible for every pruned value of ``var``."""
+        reasons = set()
+        for reason in self.removed[var.index]:
+            if reason:
+                reasons |= reason
+        return reasons
+
+    # ------------------------------------------------------------------
+    # Preprocessing and heuristics
+    # ------------------------------------------------------------------
+
+    def ac3(self):
+        """Enforce arc consistency on the binary clash constraints.
+
+        Two variables clash when they share a group or a teacher and their
+        blocks overlap. A value of X only loses its support in Y when it
+        overlaps a cell that every live value of Y covers, so revising an arc
+        only needs the intersection of Y's blocks. Returns False if a domain
+        wipes out.
+        """
+        neighbours = self.model.neighbours
+        queue = [(x, y) for x in range(len(neighbours)) for y in neighbours[x]]
+        while queue:
+            x, y = queue.pop()
+            if self._revise(self.variables[x], self.variables[y]):
+                if self.size[x] == 0:
+                    return False
+                queue.extend((z, x) for z in neighbours[x] if z != y)
+        return True
+
+    def _revise(self, var, other):
+        n_slots = len(self.time_slots)
+        common = None
+        teachers = set()
+        other_removed = self.removed[other.index]
+        for k, (d, s, t, _) in enumerate(other.values):
+            if other_removed[k] is not None:
+                continue
+            cells = other.cells << (d * n_slots + s)
+            common = cells if common is None else common & cells
+            if not common:
+                return False  # every value of var keeps a support
+            teachers.add(t)
+        if common is None:
+            return False
+        shares_group = var.group_mask & other.group_mask
+
+        revised = False
+        removed = self.removed[var.index]
+        for k, (d, s, t, _) in enumerate(var.values):
+            if removed[k] is None and var.cells << (d * n_slots + s) & common and (shares_group or teachers == {t}):
+                removed[k] = set()  # permanent, not caused by any assignment
+                self.size[var.index] -= 1
+                revised = True
+        return revised
+
+    def _select_variable(self):
+        """MRV, ties broken by conflict weight, then the number of groups involved (degree)."""
+        best = None
+        best_key = None
+        for var in self.variables:
+            if self.assignment[var.index] is not None:
+                continue
+            key = (self.size[var.index], -self.weights[var.index], -len(var.groups), var.index)
+            if best_key is None or key < best_key:
+                best, best_key = var, key
+        return best
+
+    def _order_values(self, var):
+        """LCV: try first the values that remove the fewest future values.
+
+        A ``preferred`` value, if still live, goes before all the others.
+        """
+        n_slots = len(self.time_slots)
+        n_days = len(self.days)
+        n_cells = n_days * n_slots
+        removed = self.removed[var.index]
+        live = [k for k in range(len(var.values)) if removed[k] is None]
+        preferred = self.preferred.get(var.index)
+
+        # The loads still count this variable's own values, take them out
+        own_cells = {}
+        own_teacher_cells = {}
+        own_days = {}
+        length = var.length
+        for k in live:
+            d, s, t, _ = var.values[k]
+            first = d * n_slots + s
+            for cell in range(first, first + length):
+                own_cells[cell] = own_cells.get(cell, 0) + 1
+                own_teacher_cells[(t, cell)] = own_teacher_cells.get((t, cell), 0) + 1
+            own_days[(t, d)] = own_days.get((t, d), 0) + 1
+
+        teacher_days = self.occupancy.teacher_days
+        # Of interchangeable backup teachers with nothing to teach yet, only
+        # the first is worth trying
+        skip = set()
+        if self.symmetric:
+            for members in self.model.teacher_classes:
+                skip.update([t for t in members if not teacher_days[t]][1:])
+        scored = []
+        for k in live:
+            d, s, t, backup = var.values[k]
+            if t in skip:
+                self.symmetry_pruned += 1
+                continue
+            first = d * n_slots + s
+            cost = 0
+            for cell in range(first, first + length):
+                cost += self.teacher_load[t * n_cells + cell] - own_teacher_cells[(t, cell)]
+                for g in var.group_ids:
+                    cost += self.group_load[g * n_cells + cell] - own_cells[cell]
+            # Opening a teacher's second day closes all their other days
+            days = teacher_days[t]
+            if not days >> d & 1 and days.bit_count() == MAX_TEACHING_DAYS - 1:
+                cost += sum(
+                    self.teacher_day_load[t * n_days + other_day] - own_days.get((t, other_day), 0)
+                    for other_day in range(n_days)
+                    if other_day != d and not days >> other_day & 1
+                )
+            tie = self.tie_rng.random() if self.tie_rng else k
+            scored.append((var.values[k] != preferred, backup, cost, tie, k))
+        scored.sort()
+        return [k for *_, k in scored]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def solve(self):
+        """Run the search. Returns (assignment, complete) for the best assignment found."""
+        begun = time.perf_counter()
+        self._reset_state()
+        self.nodes = 0
+        self.backtracks = 0
+        self.infeasible = False
+        self.limit = None
+        best = []
+        self.room_assignment = {}
+        trace = self.trace
+        trace.count("solves")
+        self.symmetric = self.break_symmetry and not self.fixed and not self.preferred
+        self.nogoods = self._nogoods()
+        self.keys = [session_key(var) for var in self.variables]
+        self.weights = [self.nogoods.weights.get(key, 0) for key in self.keys]
+
+        with trace.phase("ac3"):
+            for x, value in self.fixed.items():
+                self._restrict(self.variables[x], value)
+            # Values ruled out on their own by earlier solves
+            for y, j in self.nogoods.units:
+                if self.removed[y][j] is None:
+                    self.removed[y][j] = set()
+                    self.size[y] -= 1
+            consistent = self.ac3()
+        trace.count("pruned_before_search", sum(len(var.values) for var in self.variables) - sum(self.size))
+        if not consistent:
+            # Values ruled out earlier for want of a room may not be lost
+            # causes when rooms are not shared out exactly
+            self.infeasible = self.model.rooms_exact or not self.nogoods.units
+            self._flush_trace()
+            return {}, False
+        started = time.perf_counter()
+        self._init_loads()
+
+        candidates = {}
+        var = self._select_variable()
+        if var is not None:
+            candidates[var.index] = self._order_values(var)
+
+        deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+        self.restarts = 0
+        self.tie_rng = self.rng
+        restart_at = self.restart_unit * luby(1) if self.restart_unit else None
+        report_at = started
+        check_at = 0
+        while var is not None:
+            if self.nodes >= self.max_nodes:
+                self.limit = "nodes"
+                break
+            if self.nodes >= check_at:
+                check_at = self.nodes + CHECK_NODES
+                now = time.perf_counter()
+                if deadline is not None and now > deadline:
+                    self.limit = "time"
+                    break
+                if self.stop is not None and self.stop.is_set():
+                    self.limit = "stop"
+                    break
+                if self.progress is not None and now >= report_at:
+                    report_at = now + PROGRESS_INTERVAL
+                    self.progress(Progress(
+                        engine=trace.engine, total=len(self.variables), placed=len(self.order), best=len(best),
+                        nodes=self.nodes, backtracks=self.backtracks, restarts=self.restarts,
+                        elapsed=now - begun,
+                    ))
+
+            placed = False
+            queue = candidates[var.index]
+            while queue:
+                k = queue.pop(0)
+                if self.removed[var.index][k] is not None:
+                    continue
+                self.nodes += 1
+                self._assign(var, k)
+                wiped = self._forward_check(var)
+                if wiped is None:
+                    placed = True
+                    break
+                # Domain wipe-out: remember who is to blame and undo
+                self.conf[var.index] |= self._explain(wiped) - {var.index}
+                self._unassign(var)
+
+            if placed:
+                trace.counters["max_depth"] = max(trace.counters.get("max_depth", 0), len(self.order))
+                if len(self.order) > len(best):
+                    best = [(x, self.assignment[x]) for x in self.order]
+                    self.room_assignment = self._rooms_held()
+                var = self._select_variable()
+                if var is not None:
+                    self.conf[var.index] = set()
+                    candidates[var.index] = self._order_values(var)
+                continue
+
+            # Dead end: jump back to the most recent variable in the conflict set
+            self.backtracks += 1
+            conflict = self.conf[var.index] | self._explain(var)
+            if not conflict:
+                # Without an exact room matching the rooms might still have
+                # been shared out some other way
+                self.infeasible = self.model.rooms_exact
+                break
+            for x in conflict | {var.index}:
+                self.weights[x] += 1
+                self.nogoods.bump(self.keys[x])
+            literals = [(x, self.value_index[x]) for x in conflict]
+            depth = len(self.order)
+            while self.order and self.order[-1] not in conflict:
+                self._unassign(self.variables[self.order[-1]])
+            if len(self.order) < depth:
+                trace.count("backjumps")
+                trace.count("backjump_levels", depth - len(self.order))
+            h = self.order[-1]
+            self.conf[h] |= conflict - {h}
+            self._unassign(self.variables[h])
+            self._learn(literals, h)
+            var = self.variables[h]
+
+            if restart_at is not None and self.backtracks >= restart_at:
+                # Start over from an empty timetable, keeping what was learned
+                while self.order:
+                    self._unassign(self.variables[self.order[-1]])
+                self.restarts += 1
+                restart_at = self.backtracks + self.restart_unit * luby(self.restarts + 1)
+                # Weights alone rarely move an unseeded search off its path;
+                # new value tie-breaks do, and stay reproducible
+                if self.rng is None:
+                    self.tie_rng = random.Random(self.restarts)
+                var = self._select_variable()
+                if var is not None:
+                    self.conf[var.index] = set()
+                    candidates[var.index] = self._order_values(var)
+
+        complete = var is None
+        if complete:
+            best = [(x, self.assignment[x]) for x in self.order]
+            self.room_assignment = self._rooms_held()
+        trace.phases["search"] = trace.phases.get("search", 0.0) + time.perf_counter() - started
+        self._flush_trace()
+        return dict(best), complete
+
+    def _nogoods(self):
+        """The store to learn into: ``learned`` when it holds for this search, else a fresh one.
+
+        Pinned values cut the search space, so what is learned under them
+        does not hold without them; conflict weights are only a heuristic
+        and always carry over.
+        """
+        learned = self.learned
+        if (learned is not None and not self.fixed and learned.fingerprint == self.model.fingerprint
+                and learned.symmetric == self.symmetric):
+            return learned
+        nogoods = Nogoods(self.model.fingerprint, self.symmetric)
+        if learned is not None:
+            nogoods.weights = learned.weights
+        return nogoods
+
+    def _learn(self, literals, h):
+        """Record the nogood ``literals`` after backjumping to (and unassigning) ``h``.
+
+        All its literals but h's still hold, so h's value is pruned right
+        away, on the latest of the others (for good when there are none).
+        """
+        j = next(k for x, k in literals if x == h)
+        reason = {x for x, _ in literals if x != h}
+        latest = next((x for x in reversed(self.order) if x in reason), None)
+        # Watched on the two literals to stop holding first
+        watch = [(h, j)] + [(x, k) for x, k in literals if x == latest]
+        if self.nogoods.add(literals, watch):
+            self.nogoods_learned += 1
+        if self.removed[h][j] is not None:
+            return
+        self.removed[h][j] = reason
+        if reason:
+            self.pruned_log[latest].append((h, j))
+        self.size[h] -= 1
+        self._count(self.variables[h], j, -1)
+
+    def _flush_trace(self):
+        """Add the counters of the last solve to the trace."""
+        trace = self.trace
+        trace.count("nodes", self.nodes)
+        trace.count("backtracks", self.backtracks)
+        if self.infeasible:
+            trace.count("infeasible")
+        for kind, n in enumerate(self.check_counts):
+            if n:
+                name = CHECK_NAMES.get(kind, "fits")
+                trace.checks[name] = trace.checks.get(name, 0) + n
+        for component, n in self.component_nodes.items():
+            trace.count(f"nodes_{component}", n)
+        trace.count("nodes_backup", self.backup_nodes)
+        if self.symmetry_pruned:
+            trace.count("pruned_by_symmetry", self.symmetry_pruned)
+        for name, n in (("restarts", self.restarts), ("nogoods_learned", self.nogoods_learned),
+                        ("pruned_by_nogoods", self.nogood_pruned)):
+            if n:
+                trace.count(name, n)
+        self.symmetry_pruned = 0
+        self.restarts = self.nogoods_learned = self.nogood_pruned = 0
+        self.check_counts = [0] * len(self.check_counts)
+        self.component_nodes = {}
+        self.backup_nodes = 0
+
+    def _rooms_held(self):
+        if not self.model.rooms:
+            return {}
+        return {x: self.occupancy.room_of(x) for x in self.order}
+
+    def assign_rooms(self, assignment):
+        """Give rooms to an assignment found without them (e.g. by the exact engine).
+
+        Sessions with the fewest suitable rooms go first; a session left
+        without a free room gets None.
+        """
+        if not self.model.rooms:
+            return {}
+        n_slots = len(self.time_slots)
+        occupancy = Occupancy(len(self.groups), len(self.teachers), len(self.days), n_slots)
+        for x in sorted(assignment, key=lambda x: (self.variables[x].rooms.bit_count(), x)):
+            var = self.variables[x]
+            d, s, t, _ = assignment[x]
+            occupancy.add(x, var.group_mask, t, d, s, None, var.length, var.rooms)
+        # Later sessions may have moved earlier ones to other rooms
+        return {x: occupancy.room_of(x) for x in assignment}
+
+    def to_schedules(self, assignment, rooms=None):
+        """Render an assignment in the nested {group: {day: {slot: Session}}} format.
+
+        ``rooms`` maps variables to room indices; by default the rooms the
+        last ``solve`` picked are used, or new ones when it did not produce
+        this assignment.
+        """
+        if rooms is None:
+            rooms = self.room_assignment
+            if self.model.rooms and any(x not in rooms for x in assignment):
+                rooms = self.assign_rooms(assignment)
+        schedules = self.problem.empty_schedules()
+        for x, (d, s, t, backup) in assignment.items():
+            var = self.variables[x]
+            room = rooms.get(x)
+            session = var.session(self.teachers[t], backup, self.model.rooms[room]["name"] if room is not None else None)
+            labels = self.slot_labels[s:s + var.length]
+            for group in var.groups:
+                cells = schedules[group][self.days[d]]
+                for label in labels:
+                    cells[label] = session
+        return schedules
+
+    def assignment_from_schedules(self, schedules, rooms=None):
+        """Map a rendered timetable back to an assignment.
+
+        A session covering several contiguous slots is read as one block
+        starting at its first slot. Sessions that match no variable (an
+        unknown course, group or teacher) are skipped, so they show up in
+        ``unscheduled`` afterwards. If ``rooms`` is a dict, it receives the
+        room index of every session that names a known room.
+        """
+        free = {}
+        for var in self.variables:
+            free.setdefault((var.course, var.component, None if var.shared else var.groups[0]), []).append(var)
+
+        assignment = {}
+        seen = {}  # (shared session, day, first slot) -> block length
+        for schedule in schedules.values():
+            for d, day in enumerate(self.days):
+                slots = schedule.get(day, {})
+                skip = 0
+                previous = None
+                for s, label in enumerate(self.slot_labels):
+                    session = cell_session(slots.get(label))
+                    # The rest of a block that started on an earlier slot
+                    if skip and session == previous:
+                        skip -= 1
+                        continue
+                    skip = 0
+                    previous = session
+                    if session is None:
+                        continue
+                    # A shared lecture appears once per group
+                    if session.shared and (session, d, s) in seen:
+                        skip = seen[(session, d, s)] - 1
+                        continue
+                    t = self.teacher_index.get(session.teacher)
+                    candidates = free.get((session.course, session.component, session.group), [])
+                    var = next((v for v in candidates if v.teacher_ids[0] == t), None)
+                    if var is None:
+                        var = next((v for v in candidates if t in v.teacher_ids), None)
+                    if var is None:
+                        continue
+                    candidates.remove(var)
+                    assignment[var.index] = (d, s, t, t != var.teacher_ids[0])
+                    if rooms is not None and session.room in self.model.room_index:
+                        rooms[var.index] = self.model.room_index[session.room]
+                    skip = var.length - 1
+                    if session.shared:
+                        seen[(session, d, s)] = var.length
+        return assignment
+
+    def unscheduled(self, assignment):
+        """Describe the variables missing from ``assignment``."""
+        missing = []
+        for var in self.variables:
+            if var.index in assignment:
+                continue
+            name = f"{var.course} {var.component}"
+            if var.occurrence:
+                name += f" #{var.occurrence + 1}"
+            if var.shared:
+                missing.append(f"shared session: {name}")
+            else:
+                missing.append(f"{name} for {var.groups[0]}")
+        return missing
+
+
+def solve(problem, seed=None, max_nodes=DEFAULT_MAX_NODES, time_limit=None, stop=None, profile=None,
+          learn=True, cache_dir=None, progress=None):
+    """Solve ``problem`` and return a ``Solution``.
+
+    The solution is complete when every session got a slot; otherwise it
+    holds the deepest partial timetable the search reached before running
+    out of nodes or time, or before ``stop`` was set, and ``limit`` says
+    which. When the search ran out of options instead, ``infeasible`` is set. A complete timetable
+    that uses backup teachers goes through ``assign_teachers``, which keeps
+    every slot and hands as many sessions back to their primary teacher as
+    the teacher rules allow. ``profile`` runs the
+    whole solve under a profiler (see ``Trace.profiled``).
+
+    With ``learn`` the search starts from the nogoods and conflict weights
+    of earlier solves of the same problem in this process, or in
+    ``cache_dir`` when given (where it also saves them), so generating again
+    converges faster. Pass ``learn=False`` for a run independent of history.
+
+    ``progress`` is called from the search with a ``Progress`` a few times a
+    second (see ``scheduler.background`` to run a solve on a thread).
+    """
+    started = time.perf_counter()
+    trace = Trace("csp")
+    with trace.profiled(profile):
+        solver = CSPSolver(problem, seed=seed, max_nodes=max_nodes, time_limit=time_limit, stop=stop, trace=trace,
+                           progress=progress)
+        if learn:
+            solver.learned = learned_nogoods(solver.model.fingerprint, solver.break_symmetry, cache_dir)
+            trace.count("nogoods_reused", len(solver.learned))
+        assignment, complete = solver.solve()
+        if learn:
+            learned = remember_nogoods(solver.learned)
+            if cache_dir is not None:
+                save_nogoods(learned, cache_dir)
+        if complete and any(value[3] for value in assignment.values()):
+            with trace.phase("backups"):
+                before = sum(value[3] for value in assignment.values())
+                assignment = assign_teachers(solver, assignment, MAX_TEACHING_DAYS)
+                trace.count("backups_saved", before - sum(value[3] for value in assignment.values()))
+        with trace.phase("render"):
+            schedules = solver.to_schedules(assignment)
+    return Solution(
+        schedules=schedules,
+        complete=complete,
+        unscheduled=solver.unscheduled(assignment),
+        seed=seed,
+        nodes=solver.nodes,
+        backtracks=solver.backtracks,
+        elapsed=time.perf_counter() - started,
+        infeasible=solver.infeasible,
+        limit=solver.limit,
+        trace=trace.to_dict(),
+    )
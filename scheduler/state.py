@@ -0,0 +1,340 @@
+"""Bitset occupancy model for teachers, groups and rooms.
+
+Everything is integer indexed: teachers, groups, days and slots. A week cell
+is ``cell = day * n_slots + slot``.
+
+- ``group_busy[g]`` / ``teacher_busy[t]``: bitmask over cells
+- ``slot_groups[cell]``: bitmask over groups busy in that cell
+- ``teacher_days[t]``: bitmask over days the teacher works
+- ``lecture_full[day]``: bitmask over groups that already have the maximum
+  number of different lectures that day
+- ``room_busy[cell]``: bitmask over rooms taken in that cell
+
+so checking whether a session fits is a handful of bitwise operations, even
+for a shared lecture that spans every group. A session may cover ``length``
+contiguous slots; the windows its block can complete into a run that is too
+long are precomputed per (slot, length), so checking a block costs about the
+same as checking a single slot.
+
+A session that needs a room passes the bitmask of the rooms that suit it
+(type and capacity). It fits when one of them is free over its whole block,
+or can be freed by moving the sessions holding it to other rooms that suit
+them (an augmenting path, as in bipartite matching), so a room handed out
+early never makes a later session fail while the rooms could still be
+shared out. ``add`` takes the lowest free room; callers number rooms by
+increasing capacity so that is the smallest room that fits. For single-slot
+sessions this is an exact matching; a block only moves others into rooms
+free over the whole of their own block, which may miss a way to share the
+rooms out. Owners of each cell and room are kept on the side so a caller can
+find out *who* is in the way when a check fails.
+"""
+
+FITS = 0
+GROUP_CLASH = 1
+TEACHER_CLASH = 2
+TEACHER_DAYS = 3
+LECTURES_PER_DAY = 4
+CONSECUTIVE = 5
+NO_ROOM = 6
+
+CHECK_NAMES = {
+    GROUP_CLASH: "group clash",
+    TEACHER_CLASH: "teacher clash",
+    TEACHER_DAYS: "teacher days",
+    LECTURES_PER_DAY: "lectures per day",
+    CONSECUTIVE: "consecutive sessions",
+    NO_ROOM: "no room",
+}
+
+
+def iter_bits(mask):
+    """Yield the indices of the set bits of ``mask``."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Occupancy:
+    """Who is busy when, for one timetable under construction."""
+
+    def __init__(self, n_groups, n_teachers, n_days, n_slots, max_teaching_days=2,
+                 max_lectures_per_day=2, max_consecutive=3):
+        self.n_groups = n_groups
+        self.n_teachers = n_teachers
+        self.n_days = n_days
+        self.n_slots = n_slots
+        self.max_teaching_days = max_teaching_days
+        self.max_lectures_per_day = max_lectures_per_day
+        self.max_consecutive = max_consecutive
+
+        n_cells = n_days * n_slots
+        self.group_busy = [0] * n_groups
+        self.teacher_busy = [0] * n_teachers
+        self.slot_groups = [0] * n_cells
+        self.teacher_days = [0] * n_teachers
+        self.teacher_day_sessions = [[0] * n_days for _ in range(n_teachers)]
+
+        # Different lectures per group and day
+        self.lecture_courses = [{} for _ in range(n_groups * n_days)]  # course -> sessions
+        self.lecture_full = [0] * n_days
+
+        # Owners, only read when a check fails
+        self.group_owner = [[None] * n_cells for _ in range(n_groups)]
+        self.teacher_owner = [[None] * n_cells for _ in range(n_teachers)]
+
+        # Rooms: busy bitmask per cell, the room each owner holds, who holds
+        # each (room, cell), and the (cell, length, rooms) of each session
+        # that needs a room, to move it to another one
+        self.room_busy = [0] * n_cells
+        self.owner_room = {}
+        self.room_owner = {}
+        self.owner_block = {}
+
+        # Consecutive windows of max_consecutive + 1 slots, by (start slot,
+        # block length): the slots of each window outside the block
+        self._windows = {}
+
+    def windows(self, slot, length=1):
+        """Windows a block at ``slot`` could fill up, as lists of the other slots in them."""
+        key = (slot, length)
+        windows = self._windows.get(key)
+        if windows is None:
+            width = self.max_consecutive + 1
+            end = slot + length
+            windows = []
+            for start in range(max(0, slot - width + 1), min(end - 1, self.n_slots - width) + 1):
+                windows.append([j for j in range(start, start + width) if not slot <= j < end])
+            self._windows[key] = windows
+        return windows
+
+    def check(self, group_mask, teacher, day, slot, lecture=None, length=1, rooms=None):
+        """Return FITS or the kind of the first constraint the session would break."""
+        cell = day * self.n_slots + slot
+        slot_groups = self.slot_groups
+        for c in range(cell, cell + length):
+            if slot_groups[c] & group_mask:
+                return GROUP_CLASH
+        if self.teacher_busy[teacher] >> cell & ((1 << length) - 1):
+            return TEACHER_CLASH
+        days = self.teacher_days[teacher]
+        if not days >> day & 1 and days.bit_count() >= self.max_teaching_days:
+            return TEACHER_DAYS
+        if lecture is not None and self.lecture_full[day] & group_mask:
+            if self.lecture_blocked(group_mask, day, lecture):
+                return LECTURES_PER_DAY
+        if self.consecutive_groups(group_mask, day, slot, length):
+            return CONSECUTIVE
+        if rooms is not None and not self.room_available(rooms, cell, length):
+            return NO_ROOM
+        return FITS
+
+    def fits(self, group_mask, teacher, day, slot, lecture=None, length=1, rooms=None):
+        return self.check(group_mask, teacher, day, slot, lecture, length, rooms) == FITS
+
+    def free_rooms(self, rooms, cell, length=1):
+        """The rooms of ``rooms`` free in every cell of the block starting at ``cell``."""
+        room_busy = self.room_busy
+        for c in range(cell, cell + length):
+            rooms &= ~room_busy[c]
+            if not rooms:
+                break
+        return rooms
+
+    def room_available(self, rooms, cell, length=1, seen=None):
+        """True when a room of ``rooms`` is free for the block, or can be freed by moving others.
+
+        Nothing is moved. ``seen``, a ``[rooms, owners]`` pair, collects what
+        the search went through.
+        """
+        if self.free_rooms(rooms, cell, length):
+            return True
+        moved = []
+        found = self._find_room(rooms, cell, length, [0, set()] if seen is None else seen, moved) is not None
+        self._undo_moves(moved)
+        return found
+
+    def _find_room(self, rooms, cell, length, seen, moved):
+        """A room of ``rooms`` left free for the block, after moving the sessions in the way.
+
+        Every room tried goes into ``seen[0]``, so a session moving out of
+        it never moves back in, and the sessions found in the way into
+        ``seen[1]``. Each move is recorded in ``moved`` as (owner, previous
+        room). Returns None, with the moves of the failed attempts undone,
+        when there is no way.
+        """
+        rooms &= ~seen[0]
+        free = self.free_rooms(rooms, cell, length)
+        if free:
+            return (free & -free).bit_length() - 1
+        for r in iter_bits(rooms):
+            if seen[0] >> r & 1:
+                continue
+            seen[0] |= 1 << r
+            start = len(moved)
+            blockers = {self.room_owner[(r, c)] for c in range(cell, cell + length)
+                        if self.room_busy[c] >> r & 1}
+            seen[1] |= blockers
+            for other in blockers:
+                moved.append((other, self._release_room(other)))
+                other_cell, other_length, other_rooms = self.owner_block[other]
+                other_room = self._find_room(other_rooms, other_cell, other_length, seen, moved)
+                if other_room is None:
+                    break
+                self._hold_room(other, other_room)
+            else:
+                return r
+            self._undo_moves(moved, start)
+        return None
+
+    def _hold_room(self, owner, room):
+        cell, length, _ = self.owner_block[owner]
+        self.owner_room[owner] = room
+        for c in range(cell, cell + length):
+            self.room_busy[c] |= 1 << room
+            self.room_owner[(room, c)] = owner
+
+    def _release_room(self, owner):
+        room = self.owner_room.pop(owner, None)
+        if room is not None:
+            cell, length, _ = self.owner_block[owner]
+            for c in range(cell, cell + length):
+                self.room_busy[c] &= ~(1 << room)
+                del self.room_owner[(room, c)]
+        return room
+
+    def _undo_moves(self, moved, start=0):
+        """Put the owners moved since ``moved[start]`` back in the rooms they held then."""
+        previous = {}
+        for owner, room in moved[start:]:
+            previous.setdefault(owner, room)
+        del moved[start:]
+        for owner in previous:
+            self._release_room(owner)
+        for owner, room in previous.items():
+            self._hold_room(owner, room)
+
+    def room_of(self, owner):
+        """Index of the room ``owner`` holds, or None."""
+        return self.owner_room.get(owner)
+
+    def lecture_blocked(self, group_mask, day, lecture):
+        """Groups at their lecture limit that do not have ``lecture`` yet that day."""
+        blocked = 0
+        for g in iter_bits(self.lecture_full[day] & group_mask):
+            if lecture not in self.lecture_courses[g * self.n_days + day]:
+                blocked |= 1 << g
+        return blocked
+
+    def consecutive_groups(self, group_mask, day, slot, length=1):
+        """Groups that would get more than ``max_consecutive`` sessions in a row."""
+        if length > self.max_consecutive:
+            return group_mask
+        base = day * self.n_slots
+        slot_groups = self.slot_groups
+        over = 0
+        for window in self.windows(slot, length):
+            run = group_mask
+            for j in window:
+                run &= slot_groups[base + j]
+                if not run:
+                    break
+            over |= run
+        return over
+
+    def add(self, owner, group_mask, teacher, day, slot, lecture=None, length=1, rooms=None, room=None):
+        """Place a session; with ``rooms`` it takes ``room``, or else the lowest free one,
+        moving other sessions to free one if it has to."""
+        cell = day * self.n_slots + slot
+        bits = ((1 << length) - 1) << cell
+        if rooms is not None:
+            self.owner_block[owner] = (cell, length, rooms)
+            if room is None or not self.free_rooms(rooms & (1 << room), cell, length):
+                room = self._find_room(rooms, cell, length, [0, set()], [])
+            if room is not None:
+                self._hold_room(owner, room)
+        self.teacher_busy[teacher] |= bits
+        self.teacher_day_sessions[teacher][day] += 1
+        self.teacher_days[teacher] |= 1 << day
+        for c in range(cell, cell + length):
+            self.slot_groups[c] |= group_mask
+            self.teacher_owner[teacher][c] = owner
+        for g in iter_bits(group_mask):
+            self.group_busy[g] |= bits
+            owners = self.group_owner[g]
+            for c in range(cell, cell + length):
+                owners[c] = owner
+            if lecture is not None:
+                courses = self.lecture_courses[g * self.n_days + day]
+                courses[lecture] = courses.get(lecture, 0) + 1
+                if len(courses) >= self.max_lectures_per_day:
+                    self.lecture_full[day] |= 1 << g
+
+    def remove(self, group_mask, teacher, day, slot, lecture=None, length=1, rooms=None):
+        cell = day * self.n_slots + slot
+        bits = ((1 << length) - 1) << cell
+        if rooms is not None:
+            owner = self.teacher_owner[teacher][cell]
+            self._release_room(owner)
+            self.owner_block.pop(owner, None)
+        self.teacher_busy[teacher] &= ~bits
+        self.teacher_day_sessions[teacher][day] -= 1
+        if not self.teacher_day_sessions[teacher][day]:
+            self.teacher_days[teacher] &= ~(1 << day)
+        for c in range(cell, cell + length):
+            self.slot_groups[c] &= ~group_mask
+            self.teacher_owner[teacher][c] = None
+        for g in iter_bits(group_mask):
+            self.group_busy[g] &= ~bits
+            owners = self.group_owner[g]
+            for c in range(cell, cell + length):
+                owners[c] = None
+            if lecture is not None:
+                courses = self.lecture_courses[g * self.n_days + day]
+                courses[lecture] -= 1
+                if not courses[lecture]:
+                    del courses[lecture]
+                if len(courses) < self.max_lectures_per_day:
+                    self.lecture_full[day] &= ~(1 << g)
+
+    # ------------------------------------------------------------------
+    # Blame: which owners are responsible for a failed check
+    # ------------------------------------------------------------------
+
+    def blame(self, kind, group_mask, teacher, day, slot, lecture=None, length=1, rooms=None):
+        """Owners of the sessions that make ``check`` return ``kind``."""
+        cell = day * self.n_slots + slot
+        if kind == GROUP_CLASH:
+            for c in range(cell, cell + length):
+                clash = self.slot_groups[c] & group_mask
+                if clash:
+                    g = next(iter_bits(clash))
+                    return {self.group_owner[g][c]}
+        if kind == TEACHER_CLASH:
+            owners = self.teacher_owner[teacher]
+            return {owners[c] for c in range(cell, cell + length) if owners[c] is not None}
+        if kind == TEACHER_DAYS:
+            # One session per day the teacher works already fills the days
+            owners = self.teacher_owner[teacher]
+            first = {}
+            for cell in iter_bits(self.teacher_busy[teacher]):
+                first.setdefault(cell // self.n_slots, owners[cell])
+            return set(first.values())
+        if kind == LECTURES_PER_DAY:
+            g = next(iter_bits(self.lecture_blocked(group_mask, day, lecture)))
+            owners = self.group_owner[g]
+            base = day * self.n_slots
+            return {owners[base + s] for s in range(self.n_slots) if owners[base + s] is not None}
+        if kind == CONSECUTIVE:
+            g = next(iter_bits(self.consecutive_groups(group_mask, day, slot, length)))
+            owners = self.group_owner[g]
+            base = day * self.n_slots
+            return {owners[base + s] for s in range(self.n_slots)
+                    if not slot <= s < slot + length and owners[base + s] is not None}
+        if kind == NO_ROOM:
+            # Everyone the search for a room ran into: with them gone, their
+            # rooms would be free
+            seen = [0, set()]
+            self.room_available(rooms, cell, length, seen)
+            return seen[1]
+        return set()
@@ -0,0 +1,65 @@
+"""Reading and writing schedules files.
+
+Paths ending in ``.ttb`` use the binary format of ``scheduler.columnar``;
+anything else is JSON, where cells are stored as session dicts ({"course",
+"component", "teacher", "group", "backup"}). JSON files written before
+sessions were structured hold label strings, which are still accepted on
+load. Both formats are written to a temporary file and renamed into place.
+"""
+
+import json
+import os
+
+from scheduler import columnar
+from scheduler.session import Session, to_cell
+
+DEFAULT_PATH = "schedules" + columnar.SUFFIX
+LEGACY_PATH = "schedules.json"
+
+
+def schedules_to_json(schedules):
+    """Plain JSON-ready copy of ``schedules``."""
+    return {
+        group: {
+            day: {slot: cell.to_dict() if isinstance(cell, Session) else cell for slot, cell in slots.items()}
+            for day, slots in schedule.items()
+        }
+        for group, schedule in schedules.items()
+    }
+
+
+def schedules_from_json(data):
+    return {
+        group: {
+            day: {slot: to_cell(cell, group) for slot, cell in slots.items()}
+            for day, slots in schedule.items()
+        }
+        for group, schedule in data.items()
+    }
+
+
+# Save schedules to file
+def save_schedules(schedules, path=DEFAULT_PATH):
+    if path.endswith(columnar.SUFFIX):
+        columnar.save_snapshots(path, [schedules])
+        return
+    fd, tmp = columnar.temp_file(path, ".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(schedules_to_json(schedules), f)
+        columnar.replace_file(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# Load schedules from file (the latest snapshot of a binary file), None if
+# there is no such file
+def load_schedules(path=DEFAULT_PATH):
+    if not os.path.exists(path):
+        return None
+    if columnar.is_columnar(path):
+        return columnar.load_snapshot(path)
+    with open(path, "r") as f:
+        return schedules_from_json(json.load(f))
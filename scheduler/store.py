@@ -0,0 +1,167 @@
+"""Local history of generated timetables, in SQLite.
+
+Every timetable is stored once, keyed by its content hash
+(``analysis.schedule_hash``), together with its constraint-violation counts
+and soft-constraint score. Each time a run produces a timetable, a row in
+``runs`` records the catalog it was made for, the seed, the engine and its
+parameters, so identical solutions from different runs share one stored
+copy and one validation::
+
+    store = ScheduleStore("schedules.db")
+    store.add(problem, solution, engine="csp")
+    best = store.best(problem)
+"""
+
+import json
+import sqlite3
+import time
+import zlib
+
+from scheduler.analysis import schedule_hash
+from scheduler.optimize import soft_cost
+from scheduler.session import cell_label
+from scheduler.storage import schedules_from_json, schedules_to_json
+from scheduler.validator import ScheduleChecker
+
+DEFAULT_DB = "schedules.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    violations TEXT NOT NULL,
+    n_violations INTEGER NOT NULL,
+    score REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL REFERENCES schedules(hash),
+    catalog TEXT NOT NULL,
+    engine TEXT,
+    seed INTEGER,
+    params TEXT NOT NULL,
+    complete INTEGER NOT NULL,
+    elapsed REAL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_catalog ON runs(catalog, hash);
+CREATE INDEX IF NOT EXISTS schedules_rank ON schedules(n_violations, score);
+"""
+
+
+def catalog_hash(problem):
+    """Content hash of a problem, so runs on the same catalog can be grouped."""
+    return problem.fingerprint()
+
+
+class ScheduleStore:
+    """Content-addressed timetable history backed by one SQLite file."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def add(self, problem, solution, engine=None, **params):
+        """Record ``solution`` for ``problem``; returns its content hash.
+
+        The timetable is validated and scored only the first time it is
+        seen; later runs that produce the same one only add a ``runs`` row.
+        """
+        schedules = solution.schedules
+        digest = schedule_hash(schedules)
+        with self.db:
+            if self.summary(digest) is None:
+                checker = ScheduleChecker.from_schedules(problem, schedules)
+                data = json.dumps(schedules_to_json(schedules), separators=(",", ":"))
+                self.db.execute(
+                    "INSERT INTO schedules (hash, data, violations, n_violations, score, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, zlib.compress(data.encode("utf-8")), json.dumps(checker.counts),
+                     checker.total, soft_cost(problem, schedules), time.time()),
+                )
+            self.db.execute(
+                "INSERT INTO runs (hash, catalog, engine, seed, params, complete, elapsed, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, catalog_hash(problem), engine, solution.seed, json.dumps(params, sort_keys=True),
+                 int(solution.complete), solution.elapsed, time.time()),
+            )
+        return digest
+
+    def get(self, digest):
+        """The timetable stored under ``digest``, or None."""
+        row = self.db.execute("SELECT data FROM schedules WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        return schedules_from_json(json.loads(zlib.decompress(row["data"]).decode("utf-8")))
+
+    def summary(self, digest):
+        """Stored validation result of a timetable: violation counts and score, or None.
+
+        Lets callers skip re-validating a timetable the store has already seen.
+        """
+        row = self.db.execute(
+            "SELECT violations, n_violations, score FROM schedules WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"violations": json.loads(row["violations"]), "valid": row["n_violations"] == 0,
+                "score": row["score"]}
+
+    def best(self, problem, valid=True):
+        """Hash of the lowest-score timetable stored for ``problem``'s catalog, or None."""
+        row = self.db.execute(
+            "SELECT s.hash FROM schedules s JOIN runs r ON r.hash = s.hash "
+            "WHERE r.catalog = ?" + (" AND s.n_violations = 0" if valid else "") +
+            " ORDER BY s.n_violations, s.score, s.created LIMIT 1",
+            (catalog_hash(problem),),
+        ).fetchone()
+        return row["hash"] if row else None
+
+    def history(self, problem=None, limit=100):
+        """Most recent runs (optionally for one catalog), newest first, as dicts."""
+        query = ("SELECT r.id, r.hash, r.engine, r.seed, r.params, r.complete, r.elapsed, r.created, "
+                 "s.n_violations, s.score FROM runs r JOIN schedules s ON s.hash = r.hash")
+        args = ()
+        if problem is not None:
+            query += " WHERE r.catalog = ?"
+            args = (catalog_hash(problem),)
+        query += " ORDER BY r.id DESC LIMIT ?"
+        rows = self.db.execute(query, args + (limit,)).fetchall()
+        return [dict(row, params=json.loads(row["params"]), complete=bool(row["complete"])) for row in rows]
+
+    def diff(self, old, new):
+        """Cells that differ between two stored timetables.
+
+        Returns (group, day, slot, old label, new label) tuples; a group, day
+        or slot missing on one side shows up with an empty label.
+        """
+        before, after = self.get(old), self.get(new)
+        if before is None or after is None:
+            raise KeyError(old if before is None else new)
+        return diff_schedules(before, after)
+
+
+def diff_schedules(before, after):
+    """Slot-level differences between two timetables, as in ``ScheduleStore.diff``."""
+    changes = []
+    for group in list(before) + [g for g in after if g not in before]:
+        old_days, new_days = before.get(group, {}), after.get(group, {})
+        for day in list(old_days) + [d for d in new_days if d not in old_days]:
+            old_slots, new_slots = old_days.get(day, {}), new_days.get(day, {})
+            for slot in list(old_slots) + [s for s in new_slots if s not in old_slots]:
+                old_cell, new_cell = old_slots.get(slot), new_slots.get(slot)
+                if old_cell != new_cell:
+                    changes.append((group, day, slot, cell_label(old_cell), cell_label(new_cell)))
+    return changes
@@ -0,0 +1,68 @@
+"""Symmetries of a compiled model, found from the catalog.
+
+Two kinds of interchangeable things make the search revisit equivalent
+timetables:
+
+- groups: two groups with the same separate sessions (same courses,
+  components, teachers, block lengths, suitable rooms) and the same size
+  can swap their whole timetables. Within such a class, the solver keeps
+  only the timetables where one twin session (the one with the smallest
+  domain) is placed in increasing (day, slot, teacher) order from group to
+  group, a lex-leader constraint on the class.
+- teachers: backup teachers that are never anyone's primary, can take
+  exactly the same sessions and are blocked on the same slots can swap
+  everything they teach. While several of them teach nothing yet, the
+  solver only tries the first.
+
+Shared lectures count in the signature of every group that attends them,
+so groups that take different courses are never interchangeable.
+"""
+
+
+def group_classes(variables, problem):
+    """Interchangeable groups, as lists of two or more group ids in catalog order."""
+    signatures = {}
+    for var in variables:
+        if var.shared:
+            for g in var.group_ids:
+                signatures.setdefault(g, []).append((var.course, var.component, var.occurrence))
+        else:
+            signatures.setdefault(var.group_ids[0], []).append(
+                (var.course, var.component, var.occurrence, tuple(var.teacher_ids), var.length, var.rooms))
+    classes = {}
+    for g, group in enumerate(problem.groups):
+        if g in signatures:
+            key = (problem.group_size(group), tuple(sorted(signatures[g], key=repr)))
+            classes.setdefault(key, []).append(g)
+    return [members for members in classes.values() if len(members) > 1]
+
+
+def lex_chains(variables, classes):
+    """For each group class, the twin variables (in group order) whose values must increase."""
+    twins = {}
+    for var in variables:
+        if not var.shared:
+            twins.setdefault((var.course, var.component, var.occurrence), {})[var.group_ids[0]] = var.index
+    chains = []
+    for members in classes:
+        candidates = [by_group for by_group in twins.values() if members[0] in by_group]
+        if not candidates:
+            continue  # only shared sessions: nothing tells the groups apart
+        # The twin with the fewest values prunes the most
+        by_group = min(candidates, key=lambda by_group: len(variables[by_group[members[0]]].values))
+        chains.append([by_group[g] for g in members])
+    return chains
+
+
+def teacher_classes(variables, blocked):
+    """Interchangeable backup teachers, as sorted lists of two or more teacher ids."""
+    primary = {var.teacher_ids[0] for var in variables}
+    sessions = {}
+    for var in variables:
+        for t in var.teacher_ids[1:]:
+            sessions.setdefault(t, []).append(var.index)
+    classes = {}
+    for t, indices in sessions.items():
+        if t not in primary:
+            classes.setdefault((tuple(indices), frozenset(blocked[t])), []).append(t)
+    return [sorted(members) for members in classes.values() if len(members) > 1]
@@ -0,0 +1,275 @@
+"""Incremental constraint checker for timetables.
+
+``ScheduleChecker`` keeps violation counters up to date while single cells
+are set or cleared, so validating after an edit costs O(1) (O(slots) for the
+consecutive-sessions rule) instead of a rescan of every group, day and slot.
+The app keeps one checker per session: when a new timetable replaces the
+current one (generated, optimized, repaired or loaded), ``update`` passes
+only the cells that differ through ``set``/``clear``.
+"""
+
+from scheduler.session import cell_session, to_cell
+from scheduler.solver import MAX_CONSECUTIVE_SESSIONS, MAX_LECTURES_PER_DAY, MAX_TEACHING_DAYS, build_variables
+
+TEACHER_CLASH = "teacher_clash"
+TEACHER_DAYS = "teacher_days"
+LECTURES_PER_DAY = "lectures_per_day"
+CONSECUTIVE = "consecutive"
+MISSING = "missing"
+ROOM_CLASH = "room_clash"
+MISSING_ROOM = "missing_room"
+
+VIOLATION_KINDS = [TEACHER_CLASH, TEACHER_DAYS, LECTURES_PER_DAY, CONSECUTIVE, MISSING, ROOM_CLASH, MISSING_ROOM]
+
+
+class ScheduleChecker:
+    """Violation counters for one timetable, maintained cell by cell."""
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.day_index = {day: d for d, day in enumerate(problem.days)}
+        self.slot_index = {label: s for s, label in enumerate(problem.slot_labels)}
+        self.n_slots = len(problem.time_slots)
+
+        self.cells = {}               # (group, day, slot) -> Session
+        self.teacher_cell = {}        # (teacher, day, slot) -> {Session: count}
+        self.room_cell = {}           # (room, day, slot) -> {Session: count}
+        self.roomless = {}            # (Session, day, slot) -> count, when the problem lists rooms
+        self.teacher_day = {}         # (teacher, day) -> occupied cells
+        self.teacher_days = {}        # teacher -> number of days taught
+        self.lectures = {}            # (group, day) -> {course: count}
+        self.rows = {}                # (group, day) -> occupied slot bitmask
+        self.row_excess = {}          # (group, day) -> runs over the limit
+        self.components = {}          # (group, course, component) -> occupied cells
+
+        # Every group needs every component of every course it takes: one
+        # cell per slot of each of the component's weekly sessions
+        self.required = {}
+        for var in build_variables(problem.groups, problem.courses, problem.additional_teachers,
+                                   problem.component_backup_teachers, problem.backup_teachers,
+                                   problem.course_groups):
+            for group in var.groups:
+                key = (group, var.course, var.component)
+                self.required[key] = self.required.get(key, 0) + var.length
+        self.counts = {kind: 0 for kind in VIOLATION_KINDS}
+        self.counts[MISSING] = len(self.required)
+
+    @classmethod
+    def from_schedules(cls, problem, schedules):
+        checker = cls(problem)
+        checker.load(schedules)
+        return checker
+
+    def load(self, schedules):
+        for group, schedule in schedules.items():
+            for day, slots in schedule.items():
+                for slot_label, cell in slots.items():
+                    if cell:
+                        self.set(group, day, slot_label, cell)
+
+    # ------------------------------------------------------------------
+    # Edits
+    # ------------------------------------------------------------------
+
+    def set(self, group, day, slot_label, cell):
+        """Put a Session in a cell (None clears it) and update the counters."""
+        key = (group, self.day_index[day], self.slot_index[slot_label])
+        if key in self.cells:
+            self._remove(key, self.cells.pop(key))
+        session = cell_session(to_cell(cell, group))
+        if session is not None:
+            self.cells[key] = session
+            self._add(key, session)
+
+    def clear(self, group, day, slot_label):
+        self.set(group, day, slot_label, None)
+
+    def update(self, previous, schedules):
+        """Move from the timetable ``previous`` to ``schedules``, setting only the cells that differ."""
+        for group in previous.keys() | schedules.keys():
+            old_days, new_days = previous.get(group, {}), schedules.get(group, {})
+            for day in old_days.keys() | new_days.keys():
+                old, new = old_days.get(day, {}), new_days.get(day, {})
+                for slot_label in old.keys() | new.keys():
+                    cell = new.get(slot_label)
+                    if cell != old.get(slot_label):
+                        self.set(group, day, slot_label, cell or None)
+
+    def _add(self, key, session):
+        group, d, s = key
+        course, component, teacher = session.course, session.component, session.teacher
+        counts = self.counts
+
+        if teacher is not None:
+            # A shared lecture is one session even though every group lists
+            # it: its record has no group, so all groups share the same key
+            sessions = self.teacher_cell.setdefault((teacher, d, s), {})
+            if session not in sessions:
+                if sessions:
+                    counts[TEACHER_CLASH] += 1
+                sessions[session] = 0
+            sessions[session] += 1
+
+            cells = self.teacher_day.get((teacher, d), 0)
+            self.teacher_day[(teacher, d)] = cells + 1
+            if cells == 0:
+                days = self.teacher_days.get(teacher, 0) + 1
+                self.teacher_days[teacher] = days
+                if days > MAX_TEACHING_DAYS:
+                    counts[TEACHER_DAYS] += 1
+
+        if session.room is not None:
+            sessions = self.room_cell.setdefault((session.room, d, s), {})
+            if session not in sessions:
+                if sessions:
+                    counts[ROOM_CLASH] += 1
+                sessions[session] = 0
+            sessions[session] += 1
+        elif self.problem.rooms:
+            # Once per session, however many groups list it
+            cells = self.roomless.get((session, d, s), 0)
+            if cells == 0:
+                counts[MISSING_ROOM] += 1
+            self.roomless[(session, d, s)] = cells + 1
+
+        if session.is_lecture:
+            courses = self.lectures.setdefault((group, d), {})
+            if course not in courses:
+                if len(courses) >= MAX_LECTURES_PER_DAY:
+                    counts[LECTURES_PER_DAY] += 1
+                courses[course] = 0
+            courses[course] += 1
+
+        self._update_row(group, d, 1 << s, True)
+
+        have = self.components.get((group, course, component), 0) + 1
+        self.components[(group, course, component)] = have
+        if have == self.required.get((group, course, component)):
+            counts[MISSING] -= 1
+
+    def _remove(self, key, session):
+        group, d, s = key
+        course, component, teacher = session.course, session.component, session.teacher
+        counts = self.counts
+
+        if teacher is not None:
+            sessions = self.teacher_cell[(teacher, d, s)]
+            sessions[session] -= 1
+            if not sessions[session]:
+                del sessions[session]
+                if sessions:
+                    counts[TEACHER_CLASH] -= 1
+
+            cells = self.teacher_day[(teacher, d)] - 1
+            self.teacher_day[(teacher, d)] = cells
+            if cells == 0:
+                days = self.teacher_days[teacher]
+                if days > MAX_TEACHING_DAYS:
+                    counts[TEACHER_DAYS] -= 1
+                self.teacher_days[teacher] = days - 1
+
+        if session.room is not None:
+            sessions = self.room_cell[(session.room, d, s)]
+            sessions[session] -= 1
+            if not sessions[session]:
+                del sessions[session]
+                if sessions:
+                    counts[ROOM_CLASH] -= 1
+        elif self.problem.rooms:
+            cells = self.roomless.pop((session, d, s)) - 1
+            if cells:
+                self.roomless[(session, d, s)] = cells
+            else:
+                counts[MISSING_ROOM] -= 1
+
+        if session.is_lecture:
+            courses = self.lectures[(group, d)]
+            courses[course] -= 1
+            if not courses[course]:
+                del courses[course]
+                if len(courses) >= MAX_LECTURES_PER_DAY:
+                    counts[LECTURES_PER_DAY] -= 1
+
+        self._update_row(group, d, 1 << s, False)
+
+        have = self.components[(group, course, component)]
+        self.components[(group, course, component)] = have - 1
+        if have == self.required.get((group, course, component)):
+            counts[MISSING] += 1
+
+    def _update_row(self, group, d, bit, occupied):
+        row = self.rows.get((group, d), 0)
+        row = row | bit if occupied else row & ~bit
+        self.rows[(group, d)] = row
+        excess = 0
+        run = 0
+        for s in range(self.n_slots):
+            run = run + 1 if row >> s & 1 else 0
+            if run == MAX_CONSECUTIVE_SESSIONS + 1:
+                excess += 1
+        self.counts[CONSECUTIVE] += excess - self.row_excess.get((group, d), 0)
+        self.row_excess[(group, d)] = excess
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    @property
+    def is_valid(self):
+        return not any(self.counts.values())
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def issues(self):
+        """Human readable list of the current violations (only walks the offending keys)."""
+        days = self.problem.days
+        slot_labels = self.problem.slot_labels
+        issues = []
+        if self.counts[TEACHER_CLASH]:
+            for (teacher, d, s), sessions in self.teacher_cell.items():
+                if len(sessions) > 1:
+                    issues.append(f"Teacher conflict: {teacher} is scheduled twice at {days[d]} {slot_labels[s]}")
+        if self.counts[ROOM_CLASH]:
+            for (room, d, s), sessions in self.room_cell.items():
+                if len(sessions) > 1:
+                    issues.append(f"Room conflict: {room} is booked twice at {days[d]} {slot_labels[s]}")
+        if self.counts[MISSING_ROOM]:
+            for session, d, s in self.roomless:
+                who = f" for {session.group}" if session.group else ""
+                issues.append(f"Room missing: {session.course} {session.component}{who} "
+                              f"at {days[d]} {slot_labels[s]} has no room")
+        if self.counts[TEACHER_DAYS]:
+            for teacher, n_days in self.teacher_days.items():
+                if n_days > MAX_TEACHING_DAYS:
+                    issues.append(f"Teacher constraint: {teacher} teaches on {n_days} days (max is {MAX_TEACHING_DAYS})")
+        if self.counts[MISSING]:
+            for group in self.problem.groups:
+                for course, components in self.problem.courses.items():
+                    if group not in self.problem.groups_of(course):
+                        continue
+                    missing = [c for c in components if not self.components.get((group, course, c))]
+                    if len(missing) == len(components):
+                        issues.append(f"{group} is missing all components of {course}")
+                        continue
+                    issues.extend(f"{group} is missing {course} {c}" for c in missing)
+                    for c in components:
+                        have = self.components.get((group, course, c), 0)
+                        need = self.required.get((group, course, c), 0)
+                        if 0 < have < need:
+                            issues.append(f"{group} has {have} of the {need} slots of {course} {c}")
+        if self.counts[LECTURES_PER_DAY]:
+            for (group, d), courses in self.lectures.items():
+                if len(courses) > MAX_LECTURES_PER_DAY:
+                    issues.append(f"{group} has {len(courses)} courses on {days[d]} (max is {MAX_LECTURES_PER_DAY})")
+        if self.counts[CONSECUTIVE]:
+            for (group, d), excess in self.row_excess.items():
+                if excess:
+                    issues.append(f"{group} has more than {MAX_CONSECUTIVE_SESSIONS} consecutive sessions on {days[d]}")
+        return issues
+
+
+def validate(problem, schedules):
+    """One-shot validation; returns the list of issues (empty when valid)."""
+    return ScheduleChecker.from_schedules(problem, schedules).issues()